@@ -1,73 +1,162 @@
+import pathlib
+import sys
+from contextlib import contextmanager
+
 import duckdb
 import pandas as pd
 import streamlit as st
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+from src.nlp.search_index import search  # noqa: E402
+from src.telemetry import timed  # noqa: E402
+
 DB_PATH = "warehouse/analytics.duckdb"
 
 st.set_page_config(page_title="Job Skill Radar", layout="wide")
 st.title("Job Skill Radar")
 st.caption("Skills extracted from job titles + full descriptions (Indeed snapshot)")
 
+# Every widget except posting search is answered from the rollups built by
+# src/analytics/build_rollups.py, so the dashboard never scans posting-level tables;
+# search reads only the matching postings through the src/nlp/search_index.py index.
+@contextmanager
+def connect():
+    # Opened per cache miss and closed right away: an open connection holds the
+    # file lock, which would stop src.pipeline and the other writers from running
+    con = duckdb.connect(DB_PATH, read_only=True)
+    try:
+        yield con
+    finally:
+        con.close()
+
+def query(sql: str, params: list) -> pd.DataFrame:
+    with connect() as con:
+        return con.execute(sql, params).df()
+
+def filter_clause(role: str, location: str, start, end):
+    where, params = [], []
+    if role != "all":
+        where.append("role_family = ?")
+        params.append(role)
+    if location:
+        # Case-insensitive substring match, like the sidebar promises
+        where.append("strpos(lower(coalesce(location, '')), lower(?)) > 0")
+        params.append(location)
+    if start is not None and end is not None:
+        where.append("posted_date BETWEEN ? AND ?")
+        params.extend([start, end])
+    return " AND ".join(where) or "TRUE", params
+
+# timed() sits under the cache, so only cache misses (real queries) are recorded;
+# the connection is read-only, so records are spooled until the next pipeline write.
 @st.cache_data
-def load_jobs():
-    con = duckdb.connect(DB_PATH)
-    jobs = con.execute("SELECT job_id, title, company, location, posted_date, role_family FROM stg_job_postings").df()
-    con.close()
-    # Ensure posted_date is a Python date (not datetime64) for comparisons with Streamlit date_input
-    jobs["posted_date"] = pd.to_datetime(jobs["posted_date"], errors="coerce").dt.date
-    return jobs
-
-@st.cache_data
-def load_skills():
-    con = duckdb.connect(DB_PATH)
-    skills = con.execute("SELECT job_id, skill, category FROM job_skills").df()
-    con.close()
-    return skills
-
-jobs = load_jobs()
-skills = load_skills()
+@timed("dashboard.load_filter_options")
+def load_filter_options():
+    roles = query("SELECT DISTINCT role_family FROM agg_job_counts WHERE role_family IS NOT NULL ORDER BY 1", [])
+    dates = query("SELECT min(posted_date) AS lo, max(posted_date) AS hi FROM agg_job_counts", [])
+    lo, hi = dates.iloc[0]
+    # Ensure dates are Python dates (not Timestamps) for Streamlit date_input
+    lo = pd.Timestamp(lo).date() if pd.notna(lo) else None
+    hi = pd.Timestamp(hi).date() if pd.notna(hi) else None
+    return roles["role_family"].tolist(), lo, hi
+
+# Results are memoized per filter tuple; max_entries evicts the least recently used ones.
+@st.cache_data(max_entries=256)
+@timed("dashboard.load_metrics")
+def load_metrics(role, location, start, end):
+    where, params = filter_clause(role, location, start, end)
+    jobs = query(f"SELECT coalesce(sum(jobs), 0) FROM agg_job_counts WHERE {where}", params).iloc[0, 0]
+    skills = query(
+        f"SELECT coalesce(sum(mentions), 0), count(DISTINCT skill) FROM agg_skill_mentions WHERE {where}", params
+    ).iloc[0]
+    return int(jobs), int(skills.iloc[0]), int(skills.iloc[1])
+
+@st.cache_data(max_entries=256)
+@timed("dashboard.load_top_skills")
+def load_top_skills(role, location, start, end, top_n):
+    where, params = filter_clause(role, location, start, end)
+    return query(f"""
+        SELECT skill, sum(mentions)::BIGINT AS mentions
+        FROM agg_skill_mentions
+        WHERE {where}
+        GROUP BY skill
+        ORDER BY mentions DESC, skill
+        LIMIT {int(top_n)}
+    """, params)
+
+@st.cache_data(max_entries=256)
+@timed("dashboard.load_skill_list")
+def load_skill_list(role, location, start, end):
+    where, params = filter_clause(role, location, start, end)
+    return query(f"SELECT DISTINCT skill FROM agg_skill_mentions WHERE {where} AND skill IS NOT NULL ORDER BY 1", params)["skill"].tolist()
+
+@st.cache_data(max_entries=256)
+@timed("dashboard.load_trend")
+def load_trend(role, location, start, end, skill):
+    where, params = filter_clause(role, location, start, end)
+    return query(f"""
+        SELECT posted_date, sum(mentions)::BIGINT AS mentions
+        FROM agg_skill_mentions
+        WHERE {where} AND skill = ?
+        GROUP BY posted_date
+        ORDER BY posted_date
+    """, params + [skill])
+
+@st.cache_data(max_entries=256)
+@timed("dashboard.load_top_by_role")
+def load_top_by_role(role, location, start, end):
+    where, params = filter_clause(role, location, start, end)
+    # show top 10 per role
+    return query(f"""
+        SELECT role_family, skill, sum(mentions)::BIGINT AS mentions
+        FROM agg_skill_mentions
+        WHERE {where}
+        GROUP BY role_family, skill
+        QUALIFY row_number() OVER (PARTITION BY role_family ORDER BY sum(mentions) DESC, skill) <= 10
+        ORDER BY role_family, mentions DESC, skill
+    """, params)
+
+@st.cache_data(max_entries=256)
+@timed("dashboard.search_postings")
+def search_postings(role, location, start, end, text, match_all):
+    where, params = filter_clause(role, location, start, end)
+    with connect() as con:
+        try:
+            return search(con, text, limit=50, where=where, params=params, match_all=match_all)
+        except duckdb.CatalogException:
+            return None  # index not built yet
+
+role_families, min_date, max_date = load_filter_options()
 
 # ---- Sidebar filters ----
 st.sidebar.header("Filters")
 
-role_options = ["all"] + sorted(jobs["role_family"].dropna().unique().tolist())
+role_options = ["all"] + role_families
 role_choice = st.sidebar.selectbox("Role family", role_options, index=0)
 
 # Location filter (simple substring match)
 location_text = st.sidebar.text_input("Location contains (optional)", value="")
 
 # Date filter (if posted_date parsed)
-min_date = jobs["posted_date"].dropna().min()
-max_date = jobs["posted_date"].dropna().max()
-
-use_dates = pd.notna(min_date) and pd.notna(max_date)
+use_dates = min_date is not None and max_date is not None
 if use_dates:
     date_range = st.sidebar.date_input("Posted date range", value=(min_date, max_date))
 else:
     date_range = None
     st.sidebar.info("Posted dates could not be parsed for this dataset; date filtering disabled.")
 
-# ---- Apply filters ----
-f_jobs = jobs.copy()
-
-if role_choice != "all":
-    f_jobs = f_jobs[f_jobs["role_family"] == role_choice]
-
-if location_text.strip():
-    f_jobs = f_jobs[f_jobs["location"].fillna("").str.contains(location_text.strip(), case=False, na=False)]
-
+# ---- Filter tuple (pushed into SQL) ----
+start = end = None
 if use_dates and isinstance(date_range, tuple) and len(date_range) == 2:
     start, end = date_range
-    f_jobs = f_jobs[(f_jobs["posted_date"] >= start) & (f_jobs["posted_date"] <= end)]
-
-# Join skills to filtered jobs
-f = skills.merge(f_jobs[["job_id", "role_family", "posted_date"]], on="job_id", how="inner")
+filters = (role_choice, location_text.strip(), start, end)
 
 # ---- Layout ----
 col1, col2, col3 = st.columns(3)
-col1.metric("Jobs (filtered)", f_jobs["job_id"].nunique())
-col2.metric("Skill mentions", len(f))
-col3.metric("Unique skills", f["skill"].nunique())
+n_jobs, n_mentions, n_skills = load_metrics(*filters)
+col1.metric("Jobs (filtered)", n_jobs)
+col2.metric("Skill mentions", n_mentions)
+col3.metric("Unique skills", n_skills)
 
 st.divider()
 
@@ -76,23 +165,15 @@ left, right = st.columns([1, 1])
 with left:
     st.subheader("Top skills (filtered)")
     top_n = st.slider("Top N", 10, 50, 20, 5)
-    top = (
-        f.groupby("skill", as_index=False)
-        .size()
-        .rename(columns={"size": "mentions"})
-        .sort_values("mentions", ascending=False)
-        .head(top_n)
-    )
+    top = load_top_skills(*filters, top_n)
     st.dataframe(top, use_container_width=True, height=520)
 
 with right:
     st.subheader("Skill trend")
-    skill_list = sorted(f["skill"].dropna().unique().tolist())
+    skill_list = load_skill_list(*filters)
     if skill_list and use_dates:
         chosen_skill = st.selectbox("Choose a skill", skill_list, index=0)
-        trend = f[f["skill"] == chosen_skill].copy()
-        trend["posted_date"] = pd.to_datetime(trend["posted_date"])
-        by_day = trend.groupby(trend["posted_date"].dt.date).size().reset_index(name="mentions")
+        by_day = load_trend(*filters, chosen_skill)
         st.line_chart(by_day, x="posted_date", y="mentions")
     else:
         st.info("Trend chart requires parsed posted_date values.")
@@ -100,12 +181,24 @@ with right:
 st.divider()
 
 st.subheader("Top skills by role family (filtered)")
-by_role = (
-    f.groupby(["role_family", "skill"], as_index=False)
-    .size()
-    .rename(columns={"size": "mentions"})
+st.dataframe(load_top_by_role(*filters), use_container_width=True)
+
+st.divider()
+
+st.subheader("Search postings (filtered)")
+search_col, all_col = st.columns([4, 1])
+search_text = search_col.text_input(
+    "Keywords", value="", placeholder='e.g. dbt snowflake, or "data mesh" for an exact phrase'
 )
-# show top 10 per role
-by_role["rank"] = by_role.groupby("role_family")["mentions"].rank(method="first", ascending=False)
-by_role_top = by_role[by_role["rank"] <= 10].sort_values(["role_family", "mentions"], ascending=[True, False])
-st.dataframe(by_role_top.drop(columns=["rank"]), use_container_width=True)
+match_all = all_col.checkbox("Match all words", value=False)
+if search_text.strip():
+    hits = search_postings(*filters, search_text.strip(), match_all)
+    if hits is None:
+        st.info("Search index not built yet: run python -m src.nlp.search_index (or src.pipeline).")
+    else:
+        st.caption(f"{len(hits)} best matches, ranked by BM25 over title and description")
+        st.dataframe(
+            hits.drop(columns=["job_key"]),
+            use_container_width=True,
+            column_config={"job_link": st.column_config.LinkColumn("link")},
+        )
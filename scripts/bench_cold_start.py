@@ -0,0 +1,96 @@
+"""
+Cold-start cost of scoring a small batch: joblib Pipeline vs compact model.
+
+Run from the repo root:
+    python scripts/bench_cold_start.py --repeat 5 --n 50
+
+Each repeat starts fresh interpreters that score --n postings two ways: the
+src.ml.predict_role_family CLI against a scratch DuckDB holding just those
+postings (what a frequent small batch run pays end to end), and a bare
+program that imports the same module, loads the model and scores the texts.
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import duckdb
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.ml.compact import export_compact  # noqa: E402
+from src.ml.utils import connect_duckdb, fetch_postings, make_text  # noqa: E402
+
+# Prints seconds from interpreter start to the first predictions; load_model
+# picks joblib or the compact scorer from the model path, as the CLI does
+CHILD = """
+import time, json, sys
+t0 = time.perf_counter()
+from src.ml.predict_role_family import load_model
+model = load_model(sys.argv[1])
+texts = json.load(open(sys.argv[2]))
+model.predict_proba(texts)
+print(time.perf_counter() - t0)
+"""
+
+def run_cli(model: str, db_path: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-m", "src.ml.predict_role_family", "--db", db_path,
+         "--table", "sample", "--model", model, "--out-table", "pred_sample", "--no-cache"],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    )
+    return time.perf_counter() - start
+
+def run(model: str, texts_path: str) -> tuple[float, float]:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, model, texts_path],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    )
+    return time.perf_counter() - start, float(out.stdout.strip().splitlines()[-1])
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", default=str(REPO_ROOT / "warehouse" / "analytics.duckdb"))
+    p.add_argument("--table", default="stg_job_postings")
+    p.add_argument("--model", default=str(REPO_ROOT / "models" / "role_family_clf.joblib"))
+    p.add_argument("--n", type=int, default=50, help="Postings scored per run.")
+    p.add_argument("--repeat", type=int, default=5)
+    args = p.parse_args()
+
+    con = connect_duckdb(args.db)
+    df = fetch_postings(con, args.table, "job_id", "title", "location", "description_full", limit=args.n)
+    con.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = str(pathlib.Path(tmp) / "texts.json")
+        with open(texts_path, "w", encoding="utf-8") as f:
+            json.dump(make_text(df).tolist(), f)
+        compact_dir = str(pathlib.Path(tmp) / "compact")
+        export_compact(args.model, compact_dir)
+        db_path = str(pathlib.Path(tmp) / "sample.duckdb")
+        sample_con = duckdb.connect(db_path)
+        sample_con.execute("""
+            CREATE TABLE sample AS
+            SELECT posting_id AS job_id, title, location, description AS description_full FROM df
+        """)
+        sample_con.close()
+
+        print(f"{'scorer':>8} {'CLI process s':>14} {'scorer process s':>17} {'import+load+score s':>20}  (medians)")
+        for kind, model in [("joblib", args.model), ("compact", compact_dir)]:
+            cli = [run_cli(model, db_path) for _ in range(args.repeat)]
+            runs = [run(model, texts_path) for _ in range(args.repeat)]
+            print(
+                f"{kind:>8} {statistics.median(cli):>14.3f}"
+                f" {statistics.median(r[0] for r in runs):>17.3f}"
+                f" {statistics.median(r[1] for r in runs):>20.3f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+End-to-end pipeline benchmark on synthetic corpora of increasing size.
+
+Run from the repo root:
+    python scripts/bench_pipeline.py --scales 10k 100k 1M --workers 2
+
+For each scale factor a synthetic job_postings.csv is generated (and reused
+on later runs), a scratch warehouse is built from it one stage at a time, and
+each stage runs in its own process so its peak RSS is its own. Timings come
+from the pipeline_runs records the stages write. Results are appended to
+reports/pipeline_bench.csv, so runs on different commits stay comparable,
+and reports/pipeline_bench.md summarises the latest run against the previous
+one at each scale.
+"""
+import argparse
+import pathlib
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import duckdb
+import pandas as pd
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.ingest.synthetic import default_path, generate, parse_count  # noqa: E402
+from src.pipeline import MODEL_PATH, STAGES  # noqa: E402
+from src.telemetry import RUN_ID, code_version  # noqa: E402
+
+REPORT_CSV = REPO_ROOT / "reports" / "pipeline_bench.csv"
+REPORT_MD = REPO_ROOT / "reports" / "pipeline_bench.md"
+RESULT_COLUMNS = [
+    "bench_id", "benchmarked_at", "code_version", "scale", "rows", "stage",
+    "wall_seconds", "cpu_seconds", "rows_in", "rows_out", "rows_per_sec", "peak_rss_mb", "status",
+]
+
+def run_scale(rows: int, args: argparse.Namespace, stages: list) -> pd.DataFrame:
+    csv_path = default_path(rows, args.seed)
+    results = []
+    if not csv_path.exists():
+        start = time.perf_counter()
+        generate(csv_path, rows, args.seed, workers=args.workers)
+        wall = time.perf_counter() - start
+        results.append({"stage": "generate", "wall_seconds": wall, "rows_out": rows, "rows_per_sec": rows / wall,
+                         "status": "ok"})
+
+    db_path = csv_path.parent / "bench.duckdb"
+    for stale in [db_path, db_path.with_suffix(".duckdb.wal")]:
+        stale.unlink(missing_ok=True)
+
+    for stage in stages:
+        cmd = [
+            sys.executable, "-m", "src.pipeline", "--db", str(db_path), "--raw", str(csv_path),
+            "--stages", stage, "--force", "--workers", str(args.workers), "--model", args.model,
+            "--export-dir", str(csv_path.parent / "parquet"),
+        ]
+        print(f"  {stage}...", flush=True)
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stdout[-2000:] + proc.stderr[-2000:])
+            print(f"  {stage} failed at {rows:,} rows; skipping the remaining stages")
+            break
+
+    # Filtered by stage: the stages' writes also flush records spooled by other
+    # entry points (the dashboard) into this database
+    con = duckdb.connect(str(db_path), read_only=True)
+    runs = con.execute("""
+        SELECT stage, wall_seconds, cpu_seconds, rows_in, rows_out, rows_per_sec, peak_rss_mb, status
+        FROM pipeline_runs WHERE list_contains(?, stage) ORDER BY started_at
+    """, [stages]).df()
+    con.close()
+    out = pd.concat([pd.DataFrame(results), runs], ignore_index=True)
+    out.insert(0, "rows", rows)
+    return out
+
+def write_markdown(history: pd.DataFrame, bench_id: str) -> None:
+    latest = history[history["bench_id"] == bench_id]
+    lines = [
+        "# Pipeline benchmark",
+        "",
+        f"Latest run `{bench_id}` on `{latest['code_version'].iloc[0]}` ({latest['benchmarked_at'].iloc[0]}).",
+        "Generated by `python scripts/bench_pipeline.py`; full history in `pipeline_bench.csv`.",
+        "",
+    ]
+    for metric, fmt in [("wall_seconds", "{:,.2f}"), ("rows_per_sec", "{:,.0f}"), ("peak_rss_mb", "{:,.0f}")]:
+        pivot = latest.pivot_table(index="stage", columns="rows", values=metric, aggfunc="first", sort=False)
+        lines += [f"## {metric} by stage and corpus rows", "", "| stage | " + " | ".join(f"{c:,}" for c in pivot.columns) + " |",
+                  "|---|" + "---:|" * len(pivot.columns)]
+        for stage, row in pivot.iterrows():
+            lines.append(f"| {stage} | " + " | ".join("" if pd.isna(v) else fmt.format(v) for v in row) + " |")
+        lines.append("")
+
+    # Compare each (scale, stage) with the most recent earlier run that measured it
+    earlier = history[history["bench_id"] != bench_id]
+    if not earlier.empty:
+        previous = earlier.drop_duplicates(["rows", "stage"], keep="last").set_index(["rows", "stage"])
+        lines += ["## wall_seconds vs previous run", "", "| rows | stage | previous | latest | change | previous code |",
+                  "|---:|---|---:|---:|---:|---|"]
+        for _, r in latest.iterrows():
+            key = (r["rows"], r["stage"])
+            if key not in previous.index:
+                continue
+            before = previous.loc[key]
+            change = (r["wall_seconds"] / before["wall_seconds"] - 1) * 100 if before["wall_seconds"] else float("nan")
+            lines.append(f"| {r['rows']:,} | {r['stage']} | {before['wall_seconds']:,.2f} | {r['wall_seconds']:,.2f} "
+                         f"| {change:+.0f}% | `{before['code_version']}` |")
+        lines.append("")
+    REPORT_MD.write_text("\n".join(lines), encoding="utf-8")
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--scales", nargs="+", default=["10k", "100k"], help="Corpus sizes, e.g. 10k 100k 1M 10M.")
+    p.add_argument("--stages", nargs="+", choices=[s.name for s in STAGES], default=[s.name for s in STAGES])
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--workers", type=int, default=1, help="Processes used by generation, extract_skills and predict.")
+    p.add_argument("--model", default=str(MODEL_PATH))
+    args = p.parse_args()
+
+    stages = args.stages
+    if "predict" in stages and not pathlib.Path(args.model).exists():
+        print(f"No model at {args.model}; benchmarking without predict")
+        stages = [s for s in stages if s != "predict"]
+
+    frames = []
+    for scale in args.scales:
+        rows = parse_count(scale)
+        print(f"{rows:,} rows", flush=True)
+        frames.append(run_scale(rows, args, stages).assign(scale=scale))
+    results = pd.concat(frames, ignore_index=True)
+    results["bench_id"] = RUN_ID
+    results["benchmarked_at"] = datetime.now().isoformat(timespec="seconds")
+    results["code_version"] = code_version()
+    results = results[RESULT_COLUMNS]
+
+    REPORT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    history = pd.concat([pd.read_csv(REPORT_CSV), results], ignore_index=True) if REPORT_CSV.exists() else results
+    history.to_csv(REPORT_CSV, index=False)
+    write_markdown(history, RUN_ID)
+
+    print(results.pivot_table(index="stage", columns="rows", values="wall_seconds", aggfunc="first", sort=False)
+          .round(2).to_string())
+    print(f"Appended {len(results)} rows to {REPORT_CSV}; summary in {REPORT_MD}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Throughput of role-family scoring across worker counts.
+
+Run from the repo root:
+    python scripts/bench_predict_workers.py --workers 1 2 4 --batch-size 2000
+
+Every run is checked against the single-process output; predictions are not
+written to DuckDB.
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+import pandas as pd
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.ml.predict_role_family import iter_predictions  # noqa: E402
+from src.ml.utils import connect_duckdb  # noqa: E402
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", default=str(REPO_ROOT / "warehouse" / "analytics.duckdb"))
+    p.add_argument("--table", default="stg_job_postings")
+    p.add_argument("--model", default=str(REPO_ROOT / "models" / "role_family_clf.joblib"))
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--batch-size", type=int, default=2_000)
+    p.add_argument("--repeat", type=int, default=1, help="Concatenate the table this many times per run.")
+    args = p.parse_args()
+
+    con = connect_duckdb(args.db)
+    table = args.table
+    if args.repeat > 1:
+        # Not a TEMP table: postings are read on a separate cursor, which can't see those
+        con.execute(f"CREATE OR REPLACE TABLE bench_postings AS SELECT t.* FROM {table} t, range({args.repeat})")
+        table = "bench_postings"
+
+    try:
+        baseline = None
+        print(f"{'workers':>7} {'rows':>10} {'seconds':>9} {'rows/s':>10} {'speedup':>8}  identical")
+        for workers in [1] + [w for w in args.workers if w != 1]:
+            start = time.perf_counter()
+            out = pd.concat(
+                iter_predictions(
+                    con,
+                    model_path=args.model,
+                    table=table,
+                    id_col="job_id",
+                    title_col="title",
+                    loc_col="location",
+                    desc_col="description_full",
+                    batch_size=args.batch_size,
+                    workers=workers,
+                ),
+                ignore_index=True,
+            )
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline, base_elapsed = out, elapsed
+            identical = out.equals(baseline)
+            print(
+                f"{workers:>7} {len(out):>10,} {elapsed:>9.2f} {len(out) / elapsed:>10,.0f}"
+                f" {base_elapsed / elapsed:>7.2f}x  {identical}"
+            )
+    finally:
+        # Also on failure or Ctrl-C, so the copy never outlives the benchmark
+        if args.repeat > 1:
+            con.execute("DROP TABLE IF EXISTS bench_postings")
+        con.close()
+
+if __name__ == "__main__":
+    main()
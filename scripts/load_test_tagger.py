@@ -0,0 +1,77 @@
+"""
+Load test for the tagging service (python -m src.service.tagger).
+
+Run from the repo root while the service is up:
+    python scripts/load_test_tagger.py --concurrency 16 --requests 2000
+
+Sends single-posting POST /tag requests from --concurrency client threads,
+using postings sampled from DuckDB, and reports throughput and p50/p99 latency.
+"""
+import argparse
+import http.client
+import json
+import pathlib
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import numpy as np
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+def sample_postings(db: str, n: int) -> list:
+    con = duckdb.connect(db, read_only=True)
+    rows = con.execute(
+        "SELECT coalesce(title, ''), coalesce(description_full, '') "
+        f"FROM stg_job_postings USING SAMPLE {int(n)} ROWS"
+    ).fetchall()
+    con.close()
+    return [{"title": t, "description": d} for t, d in rows]
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--db", default=str(DB_PATH))
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--sample", type=int, default=500, help="Distinct postings to cycle through.")
+    args = p.parse_args()
+
+    postings = sample_postings(args.db, args.sample)
+    bodies = [json.dumps(posting).encode("utf-8") for posting in postings]
+    local = threading.local()
+
+    def send(i: int) -> float:
+        # One keep-alive connection per client thread
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection(args.host, args.port, timeout=60)
+        start = time.perf_counter()
+        local.conn.request("POST", "/tag", body=bodies[i % len(bodies)], headers={"Content-Type": "application/json"})
+        resp = local.conn.getresponse()
+        resp.read()
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = np.array(list(pool.map(send, range(args.requests)))) * 1000
+    elapsed = time.perf_counter() - start
+
+    conn = http.client.HTTPConnection(args.host, args.port, timeout=10)
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+
+    print(f"{args.requests:,} requests, concurrency {args.concurrency}: {args.requests / elapsed:,.1f} req/s")
+    print(
+        f"latency ms: p50 {np.percentile(latencies, 50):.1f} | p99 {np.percentile(latencies, 99):.1f}"
+        f" | mean {statistics.fmean(latencies):.1f} | max {latencies.max():.1f}"
+    )
+    print(f"server: {health['batches']:,} batches, avg {health['avg_batch']} postings per batch")
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ SELECT
   COUNT(*) AS postings
 FROM stg_job_postings sjp
 JOIN pred_role_family pr
-  ON sjp.job_id::VARCHAR = pr.posting_id
+  ON sjp.job_key = pr.job_key
 GROUP BY 1,2
 ORDER BY 1,3 DESC
 LIMIT 50;
@@ -18,11 +18,13 @@ LIMIT 50;
 q2 = """
 SELECT
   pr.pred_role_family,
-  js.skill,
+  sd.skill,
   COUNT(*) AS mentions
 FROM pred_role_family pr
 JOIN job_skills js
-  ON pr.posting_id = js.job_id::VARCHAR
+  ON pr.job_key = js.job_key
+JOIN skill_dim sd
+  ON js.skill_id = sd.skill_id
 GROUP BY 1,2
 ORDER BY 1,3 DESC
 LIMIT 50;
@@ -0,0 +1,47 @@
+import pathlib
+
+import duckdb
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+# Grain shared by both rollups. location is kept so the dashboard's location
+# filter can still be answered without touching the posting-level tables.
+GRAIN = ["role_family", "location", "posted_date"]
+
+def build_rollups(con: duckdb.DuckDBPyConnection) -> None:
+    # role_family is stored as plain VARCHAR: the rollups are small and are what
+    # the dashboard reads, so they keep the types it filters and sorts on
+    dims = ", ".join(f"s.{c}::VARCHAR AS {c}" if c == "role_family" else f"s.{c}" for c in GRAIN)
+    con.execute(f"""
+        CREATE OR REPLACE TABLE agg_job_counts AS
+        SELECT {dims}, COUNT(DISTINCT s.job_key) AS jobs
+        FROM stg_job_postings s
+        GROUP BY ALL
+    """)
+    # mentions counts job_skills rows (a skill listed under two categories
+    # counts twice, as in the raw table); jobs is distinct postings per cell
+    con.execute(f"""
+        CREATE OR REPLACE TABLE agg_skill_mentions AS
+        SELECT {dims}, sd.skill, cd.category, COUNT(*) AS mentions, COUNT(DISTINCT js.job_key) AS jobs
+        FROM job_skills js
+        JOIN stg_job_postings s ON s.job_key = js.job_key
+        JOIN skill_dim sd ON sd.skill_id = js.skill_id
+        JOIN category_dim cd ON cd.category_id = js.category_id
+        GROUP BY ALL
+    """)
+
+def main() -> None:
+    con = duckdb.connect(str(DB_PATH))
+    build_rollups(con)
+    counts = {
+        t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+        for t in ["job_skills", "agg_skill_mentions", "agg_job_counts"]
+    }
+    con.close()
+
+    print(f"agg_job_counts rows: {counts['agg_job_counts']:,}")
+    print(f"agg_skill_mentions rows: {counts['agg_skill_mentions']:,} (from {counts['job_skills']:,} job_skills rows)")
+
+if __name__ == "__main__":
+    main()
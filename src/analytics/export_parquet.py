@@ -0,0 +1,191 @@
+import argparse
+import pathlib
+import shutil
+from typing import Dict, List
+
+import duckdb
+import pandas as pd
+
+from src.telemetry import RUN_ID, track
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+EXPORT_DIR = REPO_ROOT / "warehouse" / "parquet"
+
+PARTITION_BY = ["posted_month", "role_family"]
+# How DuckDB (and Hive) name the directory of a NULL partition value
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# Every exported table is partitioned by its posting's month and rule-based
+# role_family, so one filter prunes all three the same way
+PARTITION_COLS = "strftime(s.posted_date, '%Y-%m') AS posted_month, s.role_family::VARCHAR AS role_family"
+
+# table -> (export query, rows per Parquet row group). Postings carry ~4k-char
+# descriptions, so their row groups are kept to roughly 64 MB uncompressed;
+# the narrow tables use DuckDB's default of 122,880 rows.
+EXPORTS = {
+    "stg_job_postings": (f"""
+        SELECT s.* EXCLUDE (role_family), {PARTITION_COLS}
+        FROM stg_job_postings s
+    """, 16_384),
+    "job_skills": (f"""
+        SELECT js.job_key, sd.skill, cd.category, {PARTITION_COLS}
+        FROM job_skills js
+        JOIN skill_dim sd ON sd.skill_id = js.skill_id
+        JOIN category_dim cd ON cd.category_id = js.category_id
+        LEFT JOIN stg_job_postings s ON s.job_key = js.job_key
+    """, 122_880),
+    "pred_role_family": (f"""
+        SELECT p.job_key, p.pred_role_family::VARCHAR AS pred_role_family, p.pred_confidence, {PARTITION_COLS}
+        FROM pred_role_family p
+        LEFT JOIN stg_job_postings s ON s.job_key = p.job_key
+    """, 122_880),
+}
+
+def _ensure_state(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS parquet_export_state (
+            table_name VARCHAR,
+            posted_month VARCHAR,
+            role_family VARCHAR,
+            rows BIGINT,
+            content_hash VARCHAR,
+            exported_at TIMESTAMP
+        )
+    """)
+
+def partition_dir(root: pathlib.Path, posted_month: str, role_family: str) -> pathlib.Path:
+    return root / f"posted_month={posted_month}" / f"role_family={role_family}"
+
+def partition_state(con: duckdb.DuckDBPyConnection, query: str) -> pd.DataFrame:
+    """Row count and an order-independent content hash per partition (NULL keys spelled as on disk)."""
+    return con.execute(f"""
+        SELECT coalesce(posted_month, '{NULL_PARTITION}') AS posted_month,
+               coalesce(role_family, '{NULL_PARTITION}') AS role_family,
+               COUNT(*) AS rows,
+               sum(hash(q))::VARCHAR AS content_hash
+        FROM ({query}) q
+        GROUP BY ALL
+    """).df()
+
+def export_table(
+    con: duckdb.DuckDBPyConnection,
+    table: str,
+    out_dir: pathlib.Path = EXPORT_DIR,
+    full_refresh: bool = False,
+) -> Dict[str, int]:
+    """
+    Bring out_dir/<table>/posted_month=.../role_family=.../*.parquet up to date.
+
+    Partitions whose row count and content hash match the last export (and
+    whose directory is still there) are left alone; touched partitions are
+    written in one partitioned COPY to a staging directory and swapped in one
+    directory rename each, and partitions that no longer have rows are removed.
+    Rows are sorted by job_key inside each file, so the min/max statistics
+    DuckDB writes per row group let readers skip groups on job_key too.
+    """
+    query, row_group_size = EXPORTS[table]
+    table_dir = out_dir / table
+    current = partition_state(con, query)
+    previous = con.execute(
+        "SELECT posted_month, role_family, rows AS prev_rows, content_hash AS prev_hash "
+        "FROM parquet_export_state WHERE table_name = ?", [table]
+    ).df()
+    if full_refresh:
+        previous = previous.iloc[0:0]
+
+    merged = current.merge(previous, on=PARTITION_BY, how="outer", indicator=True)
+    on_disk = [partition_dir(table_dir, m, r).is_dir() for m, r in zip(merged["posted_month"], merged["role_family"])]
+    touched = merged[
+        (merged["_merge"] == "left_only")
+        | ((merged["_merge"] == "both")
+           & ((merged["rows"] != merged["prev_rows"]) | (merged["content_hash"] != merged["prev_hash"])
+              | ~pd.Series(on_disk, index=merged.index)))
+    ][PARTITION_BY]
+    removed = merged[merged["_merge"] == "right_only"][PARTITION_BY]
+
+    rows_written = 0
+    if len(touched):
+        staging = out_dir / f".staging_{table}_{RUN_ID}"
+        shutil.rmtree(staging, ignore_errors=True)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        con.execute(f"""
+            COPY (
+                SELECT q.* FROM ({query}) q
+                SEMI JOIN touched t
+                  ON coalesce(q.posted_month, '{NULL_PARTITION}') = t.posted_month
+                 AND coalesce(q.role_family, '{NULL_PARTITION}') = t.role_family
+                ORDER BY q.posted_month, q.role_family, q.job_key
+            ) TO '{staging.as_posix()}' (
+                FORMAT parquet, PARTITION_BY ({", ".join(PARTITION_BY)}),
+                ROW_GROUP_SIZE {row_group_size}, COMPRESSION zstd
+            )
+        """)
+        # Readers see either the old or the new partition, never a half-written one
+        for month, role in zip(touched["posted_month"], touched["role_family"]):
+            src, dst = partition_dir(staging, month, role), partition_dir(table_dir, month, role)
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            old = dst.with_name(f".old_{dst.name}_{RUN_ID}")
+            if dst.exists():
+                dst.rename(old)
+            src.rename(dst)
+            shutil.rmtree(old, ignore_errors=True)
+        shutil.rmtree(staging, ignore_errors=True)
+        rows_written = int(current.merge(touched, on=PARTITION_BY)["rows"].sum())
+
+    for month, role in zip(removed["posted_month"], removed["role_family"]):
+        dst = partition_dir(table_dir, month, role)
+        shutil.rmtree(dst, ignore_errors=True)
+        if dst.parent.is_dir() and not any(dst.parent.iterdir()):
+            dst.parent.rmdir()
+
+    con.execute("DELETE FROM parquet_export_state WHERE table_name = ?", [table])
+    con.execute(
+        "INSERT INTO parquet_export_state SELECT ?, posted_month, role_family, rows, content_hash, current_timestamp "
+        "FROM current", [table]
+    )
+    return {
+        "partitions": len(current),
+        "rewritten": len(touched),
+        "removed": len(removed),
+        "rows_written": rows_written,
+    }
+
+def export_parquet(
+    con: duckdb.DuckDBPyConnection,
+    out_dir: pathlib.Path = EXPORT_DIR,
+    tables: List[str] | None = None,
+    full_refresh: bool = False,
+) -> int:
+    """Export every table in EXPORTS that exists (or just `tables`); returns rows written."""
+    _ensure_state(con)
+    existing = {r[0] for r in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    rows_written = 0
+    for table in tables or list(EXPORTS):
+        if table not in existing or "stg_job_postings" not in existing:
+            print(f"{table}: not in the warehouse, skipping")
+            continue
+        stats = export_table(con, table, out_dir, full_refresh)
+        rows_written += stats["rows_written"]
+        print(
+            f"{table}: {stats['rewritten']} of {stats['partitions']} partitions rewritten "
+            f"({stats['rows_written']:,} rows), {stats['removed']} removed"
+        )
+    return rows_written
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Export staging, skills and predictions as Hive-partitioned Parquet.")
+    p.add_argument("--db", default=str(DB_PATH))
+    p.add_argument("--out", default=str(EXPORT_DIR))
+    p.add_argument("--tables", nargs="+", choices=list(EXPORTS), default=None)
+    p.add_argument("--full-refresh", action="store_true", help="Rewrite every partition.")
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of the export.")
+    args = p.parse_args()
+
+    con = duckdb.connect(args.db)
+    with track(con, "export", profile_dir=args.profile) as run:
+        run.rows_out = export_parquet(con, pathlib.Path(args.out), args.tables, args.full_refresh)
+    con.close()
+    print(f"Read with: read_parquet('{pathlib.Path(args.out).as_posix()}/<table>/**/*.parquet', hive_partitioning = true)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import pathlib
+from typing import List, Tuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+# role_family value used for the rows computed over every posting
+ALL_ROLES = "all"
+
+def incidence_matrix(
+    con: duckdb.DuckDBPyConnection, role_family: str | None = None
+) -> Tuple[sp.csr_matrix, np.ndarray, np.ndarray]:
+    """
+    Boolean job x skill matrix for one role_family (None for every posting).
+
+    Returns (matrix, job_keys, skills): rows are positions in job_keys,
+    columns are skill_dim ids and skills[skill_id] is the skill's name. A
+    skill listed under two categories counts once per job.
+    """
+    where = "TRUE" if role_family is None else "s.role_family = ?"
+    pairs = con.execute(f"""
+        SELECT DISTINCT js.job_key, js.skill_id
+        FROM job_skills js
+        JOIN stg_job_postings s ON s.job_key = js.job_key
+        WHERE {where}
+    """, [] if role_family is None else [role_family]).df()
+    job_keys, job_idx = np.unique(pairs["job_key"].to_numpy(dtype=np.uint64), return_inverse=True)
+    # skill_ids are small and dense, so they index the columns directly
+    names = con.execute("SELECT skill_id, skill FROM skill_dim").fetchall()
+    skills = np.full(max((i for i, _ in names), default=0) + 1, "", dtype=object)
+    for skill_id, skill in names:
+        skills[skill_id] = skill
+    matrix = sp.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (job_idx, pairs["skill_id"].to_numpy(dtype=np.int64))),
+        shape=(len(job_keys), len(skills)),
+    )
+    return matrix, job_keys, skills
+
+def cooccurrence(matrix: sp.csr_matrix, skills: np.ndarray, n_jobs: int, min_jobs: int = 1) -> pd.DataFrame:
+    """
+    Pairwise co-occurrence of the skill columns of an incidence matrix.
+
+    One sparse product X^T X gives every pair count at once; lift is
+    P(a, b) / (P(a) P(b)) over n_jobs postings (including postings with no
+    skills) and Jaccard is |a & b| / |a | b|. Both directions of each pair are
+    returned so "related to X" is a filter on `skill`.
+    """
+    counts = (matrix.T @ matrix).tocoo()
+    support = np.asarray(matrix.sum(axis=0)).ravel()
+    keep = (counts.row != counts.col) & (counts.data >= min_jobs)
+    a, b, together = counts.row[keep], counts.col[keep], counts.data[keep].astype(np.int64)
+    n_a, n_b = support[a].astype(np.int64), support[b].astype(np.int64)
+    return pd.DataFrame({
+        "skill": skills[a],
+        "related_skill": skills[b],
+        "jobs_together": together,
+        "skill_jobs": n_a,
+        "related_jobs": n_b,
+        "lift": together * n_jobs / (n_a * n_b),
+        "jaccard": together / (n_a + n_b - together),
+    })
+
+def build_cooccurrence(con: duckdb.DuckDBPyConnection, min_jobs: int = 2) -> int:
+    """(Re)build skill_cooccurrence for every role_family plus ALL_ROLES; returns its row count."""
+    role_jobs = dict(con.execute("""
+        SELECT role_family::VARCHAR, COUNT(DISTINCT job_key) FROM stg_job_postings
+        WHERE role_family IS NOT NULL GROUP BY 1
+    """).fetchall())
+    groups: List[Tuple[str, str | None, int]] = [
+        (ALL_ROLES, None, con.execute("SELECT COUNT(DISTINCT job_key) FROM stg_job_postings").fetchone()[0])
+    ] + [(role, role, n) for role, n in sorted(role_jobs.items())]
+
+    frames = []
+    for label, role, n_jobs in groups:
+        matrix, _, skills = incidence_matrix(con, role)
+        df = cooccurrence(matrix, skills, n_jobs, min_jobs)
+        df.insert(0, "role_family", label)
+        df["role_jobs"] = n_jobs
+        frames.append(df)
+    out = pd.concat(frames, ignore_index=True)
+
+    con.execute("""
+        CREATE OR REPLACE TABLE skill_cooccurrence AS
+        SELECT * FROM out ORDER BY role_family, skill, jobs_together DESC, related_skill
+    """)
+    return len(out)
+
+def related_skills(
+    con: duckdb.DuckDBPyConnection,
+    skill: str,
+    role_family: str = ALL_ROLES,
+    by: str = "lift",
+    min_jobs: int = 2,
+    limit: int = 10,
+) -> pd.DataFrame:
+    """Skills most associated with `skill`, ranked by lift, jaccard or jobs_together."""
+    if by not in ("lift", "jaccard", "jobs_together"):
+        raise ValueError("by must be one of: lift, jaccard, jobs_together")
+    return con.execute(f"""
+        SELECT related_skill, jobs_together, related_jobs, lift, jaccard
+        FROM skill_cooccurrence
+        WHERE role_family = ? AND skill = ? AND jobs_together >= ?
+        ORDER BY {by} DESC, jobs_together DESC, related_skill
+        LIMIT ?
+    """, [role_family, skill.lower().strip(), min_jobs, limit]).df()
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--min-jobs", type=int, default=2, help="Drop pairs seen together in fewer postings.")
+    p.add_argument("--related", default=None, help="After building, print the skills related to this one.")
+    p.add_argument("--role-family", default=ALL_ROLES)
+    p.add_argument("--by", choices=["lift", "jaccard", "jobs_together"], default="lift")
+    args = p.parse_args()
+
+    con = duckdb.connect(str(DB_PATH))
+    n_rows = build_cooccurrence(con, args.min_jobs)
+    print(f"skill_cooccurrence rows: {n_rows:,} (pairs in both directions, per role_family + '{ALL_ROLES}')")
+    if args.related:
+        print(related_skills(con, args.related, args.role_family, args.by).to_string(index=False))
+    con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import pathlib
+import re
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from src.parallel import bounded_map
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always share a band
+THRESHOLD = 0.8
+SEED = 42
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    # murmur3 finalizer; uint64 multiplication wraps, which is what we want
+    x = x ^ (x >> np.uint64(33))
+    x = x * np.uint64(0xFF51AFD7ED558CCD)
+    x = x ^ (x >> np.uint64(33))
+    x = x * np.uint64(0xC4CEB9FE1A85EC53)
+    return x ^ (x >> np.uint64(33))
+
+def _perm_seeds(num_perm: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(1, 2**63, size=num_perm, dtype=np.uint64)
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> np.ndarray:
+    """64-bit hashes of the distinct k-word shingles of a text."""
+    words = TOKEN.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    ids = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    if len(ids) < k:
+        k = len(ids)
+    # Polynomial rolling combination of k consecutive word hashes
+    h = np.zeros(len(ids) - k + 1, dtype=np.uint64)
+    for j in range(k):
+        h = h * np.uint64(1_000_003) + ids[j:len(ids) - k + 1 + j]
+    return np.unique(h)
+
+def minhash(texts: List[str], seeds: np.ndarray) -> np.ndarray:
+    """(len(texts), len(seeds)) uint32 MinHash signatures; empty texts get all-max rows."""
+    sigs = np.full((len(texts), len(seeds)), np.iinfo(np.uint32).max, dtype=np.uint32)
+    for i, text in enumerate(texts):
+        sh = shingle_hashes(text)
+        if len(sh):
+            mixed = _mix64(sh[None, :] ^ seeds[:, None])
+            sigs[i] = (mixed.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+    return sigs
+
+# Permutation seeds used by _signature_batch; set once per worker by _init_worker.
+_SEEDS: np.ndarray | None = None
+
+def _init_worker(num_perm: int, seed: int) -> None:
+    global _SEEDS
+    _SEEDS = _perm_seeds(num_perm, seed)
+
+def _signature_batch(batch: List[Tuple[int, str]]) -> Tuple[List[int], np.ndarray]:
+    return [job_key for job_key, _ in batch], minhash([text for _, text in batch], _SEEDS)
+
+def _iter_batches(
+    con: duckdb.DuckDBPyConnection, table: str, batch_size: int
+) -> Iterator[List[Tuple[int, str]]]:
+    cur = con.execute(f"SELECT job_key, coalesce(description_full, '') FROM {table} ORDER BY job_key")
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = np.arange(n)
+
+    def find(self, i: int) -> int:
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            # keep the smaller index as root so the lowest job_key ends up canonical
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+def cluster(sigs: np.ndarray, bands: int = BANDS, threshold: float = THRESHOLD) -> np.ndarray:
+    """
+    Cluster signatures with LSH banding; returns each row's root row index.
+
+    Rows that collide in any band become candidates. Each bucket is first
+    checked as a star around its first member, which settles the common case
+    (a bucket of reposts of one posting) in n comparisons. Members below the
+    threshold against the head are then compared with every other member, so
+    every above-threshold pair that shares a bucket is linked; only buckets
+    of mutually dissimilar rows pay close to n**2 comparisons.
+    """
+    n, num_perm = sigs.shape
+    rows_per_band = num_perm // bands
+    uf = _UnionFind(n)
+    # Postings without any text are left as singletons
+    idx = np.flatnonzero(~(sigs == np.iinfo(np.uint32).max).all(axis=1))
+    weights = _perm_seeds(rows_per_band, SEED + 1)
+    for b in range(bands):
+        band = sigs[idx, b * rows_per_band:(b + 1) * rows_per_band].astype(np.uint64)
+        keys = _mix64((band * weights).sum(axis=1, dtype=np.uint64) + np.uint64(b))
+        order = idx[np.argsort(keys, kind="stable")]
+        sorted_keys = np.sort(keys, kind="stable")
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(idx)]
+        multi = (ends - starts) >= 2
+        for s, e in zip(starts[multi], ends[multi]):
+            members = order[s:e]
+            block = sigs[members]
+            head_sim = (block[1:] == block[0]).mean(axis=1)
+            for m in members[1:][head_sim >= threshold]:
+                uf.union(members[0], m)
+            for i in np.flatnonzero(head_sim < threshold) + 1:
+                sim = (block == block[i]).mean(axis=1)
+                sim[i] = 0.0
+                for j in np.flatnonzero(sim >= threshold):
+                    uf.union(members[i], members[j])
+    return np.array([uf.find(i) for i in range(n)])
+
+def build_canonical(
+    con: duckdb.DuckDBPyConnection,
+    table: str = "stg_job_postings",
+    threshold: float = THRESHOLD,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+    workers: int = 1,
+    batch_size: int = 20_000,
+) -> int:
+    """(Re)build job_canonical and the {table}_canonical view; returns job_canonical's row count."""
+    if num_perm % bands:
+        raise ValueError("num_perm must be a multiple of bands")
+    job_keys: List[int] = []
+    chunks: List[np.ndarray] = []
+    for ids, sigs in bounded_map(
+        _signature_batch,
+        _iter_batches(con, table, batch_size),
+        workers=workers,
+        initializer=_init_worker,
+        initargs=(num_perm, SEED),
+    ):
+        job_keys.extend(ids)
+        chunks.append(sigs)
+    sigs = np.vstack(chunks) if chunks else np.empty((0, num_perm), dtype=np.uint32)
+
+    roots = cluster(sigs, bands, threshold)
+    sizes: Dict[int, int] = dict(zip(*np.unique(roots, return_counts=True)))
+    keys = np.array(job_keys, dtype=np.uint64)
+    out = pd.DataFrame({
+        "job_key": keys,
+        "canonical_job_key": keys[roots] if len(keys) else keys,
+        "cluster_size": [sizes[r] for r in roots],
+    })
+
+    # Keyed like every other posting-level table (see src.clean.schema)
+    con.execute("""
+        CREATE OR REPLACE TABLE job_canonical AS
+        SELECT job_key::UBIGINT AS job_key, canonical_job_key::UBIGINT AS canonical_job_key,
+               cluster_size::INTEGER AS cluster_size
+        FROM out
+    """)
+    # One representative per near-duplicate cluster, for downstream stages.
+    # Postings staged since the last run aren't clustered yet and count as
+    # their own canonical rather than dropping out of the view.
+    con.execute(f"""
+        CREATE OR REPLACE VIEW {table}_canonical AS
+        SELECT s.*
+        FROM {table} s
+        LEFT JOIN job_canonical c ON c.job_key = s.job_key
+        WHERE coalesce(c.canonical_job_key, s.job_key) = s.job_key
+    """)
+    return len(out)
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--table", default="stg_job_postings")
+    p.add_argument("--threshold", type=float, default=THRESHOLD, help="Estimated Jaccard needed to merge two postings.")
+    p.add_argument("--num-perm", type=int, default=NUM_PERM)
+    p.add_argument("--bands", type=int, default=BANDS)
+    p.add_argument("--workers", type=int, default=1, help="Processes used to compute signatures.")
+    p.add_argument("--batch-size", type=int, default=20_000)
+    args = p.parse_args()
+    if args.num_perm % args.bands:
+        raise SystemExit("--num-perm must be a multiple of --bands")
+
+    con = duckdb.connect(str(DB_PATH))
+    n_rows = build_canonical(
+        con, args.table, args.threshold, args.num_perm, args.bands, args.workers, args.batch_size
+    )
+    n_clusters, n_dupes = con.execute("""
+        SELECT count(*) FILTER (WHERE job_key = canonical_job_key), count(*) FILTER (WHERE cluster_size > 1)
+        FROM job_canonical
+    """).fetchone()
+    con.close()
+
+    print(f"job_canonical rows: {n_rows:,} | clusters: {n_clusters:,} | postings in multi-posting clusters: {n_dupes:,}")
+    print(f"View {args.table}_canonical holds one posting per cluster")
+
+if __name__ == "__main__":
+    main()
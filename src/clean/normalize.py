@@ -1,5 +1,6 @@
 from datetime import date, timedelta
 
+import argparse
 import hashlib
 import pathlib
 import re
@@ -7,6 +8,9 @@ import re
 import duckdb
 import pandas as pd
 
+from src.clean.schema import ROLE_FAMILY_TYPE, create_types, job_key, job_key_sql, table_columns
+from src.telemetry import track
+
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
 DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
 
@@ -76,10 +80,37 @@ def parse_indeed_date(s: str, reference: date) -> date | None:
     return dt.date()
 
 
-def main() -> None:
-    con = duckdb.connect(str(DB_PATH))
+# Python's \s (used by _clean_text) matches Unicode whitespace; RE2's \s is
+# ASCII-only, so spell out the same set for DuckDB's regexp_replace.
+WHITESPACE_RE2 = (
+    r"[\t\n\x{0b}\f\r\x{1c}-\x{1f} \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}"
+    r"\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]+"
+)
+DAYS_AGO_RE2 = r"(\d+)\s*\+?\s*day"
+
+# Duplicate job_ids keep the first raw row in this order: the latest snapshot
+# wins, and within a snapshot the earliest row in the file.
+RAW_ORDER = "reference_date DESC, snapshot_id DESC, source_row"
 
-    df = con.execute("SELECT * FROM raw_job_postings").df()
+STG_COLUMNS = [
+    "job_key",
+    "job_id",
+    "title",
+    "company",
+    "location",
+    "rating",
+    "posted_date",
+    "posted_date_raw",
+    "salary_raw",
+    "job_link",
+    "description_short",
+    "description_full",
+    "role_family",
+    "snapshot_id",
+]
+
+def normalize_pandas(con: duckdb.DuckDBPyConnection) -> pd.DataFrame:
+    df = con.execute(f"SELECT * FROM raw_job_postings ORDER BY {RAW_ORDER}").df()
 
     # Drop index-like column if present
     if "Unnamed: 0" in df.columns:
@@ -92,11 +123,12 @@ def main() -> None:
 
     # Create job_id
     df["job_id"] = df.apply(_make_job_id, axis=1)
+    df["job_key"] = df["job_id"].map(job_key).astype("uint64")
 
-    # The dataset is a snapshot from Nov 20, 2022 (per Kaggle description)
-    reference_date = date(2022, 11, 20)
     df["posted_date_raw"] = df["Date"]
-    df["posted_date"] = df["Date"].apply(lambda x: parse_indeed_date(x, reference_date))
+    # Each snapshot is parsed against its own scrape date
+    reference_dates = pd.to_datetime(df["reference_date"]).dt.date
+    df["posted_date"] = [parse_indeed_date(x, ref) for x, ref in zip(df["Date"], reference_dates)]
 
     # Role family
     df["role_family"] = df["Title"].apply(_role_family)
@@ -107,6 +139,7 @@ def main() -> None:
 
     # Keep a clean set of columns for downstream
     out = df[[
+        "job_key",
         "job_id",
         "Title",
         "Company",
@@ -119,6 +152,7 @@ def main() -> None:
         "description_short",
         "description_full",
         "role_family",
+        "snapshot_id",
     ]].rename(columns={
         "Title": "title",
         "Company": "company",
@@ -129,13 +163,203 @@ def main() -> None:
     })
 
     # Dedupe on job_id
-    out = out.drop_duplicates(subset=["job_id"]).reset_index(drop=True)
+    return out.drop_duplicates(subset=["job_id"]).reset_index(drop=True)
+
+def _clean_sql(col: str) -> str:
+    # SQL twin of _clean_text: NULL -> '', collapse whitespace runs, trim.
+    return f"""trim(regexp_replace(coalesce(CAST("{col}" AS VARCHAR), ''), '{WHITESPACE_RE2}', ' ', 'g'))"""
+
+def normalize_sql(where: str = "TRUE") -> str:
+    """
+    SELECT that builds stg_job_postings from raw_job_postings inside DuckDB.
+
+    Mirrors _clean_text, _make_job_id, parse_indeed_date and _role_family
+    column-at-a-time instead of row-at-a-time. The one intentional gap is
+    parse_indeed_date's last-resort pd.to_datetime fallback, which becomes a
+    TRY_CAST to TIMESTAMP (ISO-style dates parse, free-form ones become NULL).
+    Duplicate job_ids keep the first raw row in RAW_ORDER, as drop_duplicates does.
+    `where` filters raw_job_postings (e.g. to the snapshots not yet staged).
+    """
+    return f"""
+    WITH cleaned AS (
+        SELECT
+            {_clean_sql("Title")} AS title,
+            {_clean_sql("Company")} AS company,
+            {_clean_sql("Location")} AS location,
+            "Rating" AS rating,
+            {_clean_sql("Date")} AS posted_date_raw,
+            {_clean_sql("Salary")} AS salary_raw,
+            {_clean_sql("Links")} AS job_link,
+            {_clean_sql("Description")} AS description_short,
+            {_clean_sql("Descriptions")} AS description_full,
+            snapshot_id,
+            reference_date,
+            source_row
+        FROM raw_job_postings
+        WHERE {where}
+    ),
+    keyed AS (
+        SELECT
+            *,
+            left(sha256(concat_ws('|', title, company, location, posted_date_raw, job_link)), 16) AS job_id,
+            lower(posted_date_raw) AS date_lc,
+            lower(title) AS title_lc
+        FROM cleaned
+    )
+    SELECT
+        {job_key_sql()} AS job_key,
+        job_id,
+        title,
+        company,
+        location,
+        rating,
+        CASE
+            WHEN date_lc = '' THEN NULL
+            WHEN contains(date_lc, 'today') OR contains(date_lc, 'just posted') THEN reference_date
+            WHEN regexp_matches(date_lc, '{DAYS_AGO_RE2}')
+                THEN reference_date - TRY_CAST(regexp_extract(date_lc, '{DAYS_AGO_RE2}', 1) AS INTEGER)
+            ELSE TRY_CAST(posted_date_raw AS TIMESTAMP)::DATE
+        END AS posted_date,
+        posted_date_raw,
+        salary_raw,
+        job_link,
+        description_short,
+        description_full,
+        CASE
+            WHEN contains(title_lc, 'data engineer') THEN 'data_engineer'
+            WHEN contains(title_lc, 'data analyst') OR contains(title_lc, 'business analyst') THEN 'data_analyst'
+            WHEN contains(title_lc, 'data scientist') THEN 'data_scientist'
+            WHEN contains(title_lc, 'machine learning') THEN 'ml_engineer'
+            WHEN contains(title_lc, 'bi ') OR contains(title_lc, 'business intelligence') THEN 'bi'
+            ELSE 'other'
+        END::{ROLE_FAMILY_TYPE} AS role_family,
+        snapshot_id
+    FROM keyed
+    QUALIFY row_number() OVER (PARTITION BY job_id ORDER BY {RAW_ORDER}) = 1
+    ORDER BY {RAW_ORDER}
+    """
+
+def check_parity(con: duckdb.DuckDBPyConnection) -> int:
+    """Build staging with both engines and return the number of rows that differ."""
+    expected = normalize_pandas(con)
+    con.execute(f"CREATE OR REPLACE TEMP TABLE stg_sql AS {normalize_sql()}")
+    cols = ", ".join(STG_COLUMNS)
+    only_pandas = con.execute(f"SELECT {cols} FROM expected EXCEPT ALL SELECT {cols} FROM stg_sql").df()
+    only_sql = con.execute(f"SELECT {cols} FROM stg_sql EXCEPT ALL SELECT {cols} FROM expected").df()
+
+    print(f"pandas rows: {len(expected):,} | sql rows: {con.execute('SELECT COUNT(*) FROM stg_sql').fetchone()[0]:,}")
+    print(f"rows only in pandas output: {len(only_pandas):,} | rows only in sql output: {len(only_sql):,}")
+    if len(only_pandas):
+        print(only_pandas.head(5).to_string(index=False))
+    if len(only_sql):
+        print(only_sql.head(5).to_string(index=False))
+    return len(only_pandas) + len(only_sql)
+
+def _table_exists(con: duckdb.DuckDBPyConnection, name: str) -> bool:
+    sql = "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?"
+    return con.execute(sql, [name]).fetchone()[0] > 0
+
+def _record_staged(con: duckdb.DuckDBPyConnection, where: str = "TRUE") -> None:
+    con.execute(f"""
+        INSERT INTO stg_normalize_state
+        SELECT snapshot_id, checksum, current_timestamp FROM raw_snapshots WHERE {where}
+    """)
+
+def normalize_incremental(con: duckdb.DuckDBPyConnection) -> int | None:
+    """
+    Stage only the snapshots loaded since the last run and upsert them by job_id.
+
+    stg_normalize_state is the watermark: the (snapshot_id, checksum) pairs
+    already staged. Incoming rows replace staged rows with the same job_id
+    unless the staged row comes from a later snapshot, which is the same
+    winner RAW_ORDER picks in a full rebuild. Returns the number of upserted
+    rows, or None when a full rebuild is needed instead (no state yet, or a
+    staged snapshot was reloaded with different contents).
+    """
+    if not all(_table_exists(con, t) for t in ["stg_job_postings", "stg_normalize_state", "raw_snapshots"]):
+        return None
+    if "job_key" not in table_columns(con, "stg_job_postings"):
+        return None  # staged before the compact schema
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE pending_snapshots AS
+        SELECT r.snapshot_id, r.reference_date, s.snapshot_id IS NOT NULL AS reloaded
+        FROM raw_snapshots r
+        LEFT JOIN stg_normalize_state s ON s.snapshot_id = r.snapshot_id
+        WHERE s.checksum IS DISTINCT FROM r.checksum
+    """)
+    if con.execute("SELECT bool_or(reloaded) FROM pending_snapshots").fetchone()[0]:
+        return None
+
+    pending = "snapshot_id IN (SELECT snapshot_id FROM pending_snapshots)"
+    con.execute(f"CREATE OR REPLACE TEMP TABLE stg_delta AS {normalize_sql(pending)}")
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE stg_upsert AS
+        SELECT d.*
+        FROM stg_delta d
+        JOIN pending_snapshots p ON p.snapshot_id = d.snapshot_id
+        LEFT JOIN stg_job_postings s ON s.job_key = d.job_key
+        LEFT JOIN raw_snapshots r ON r.snapshot_id = s.snapshot_id
+        WHERE s.job_key IS NULL
+           OR r.snapshot_id IS NULL
+           OR p.reference_date > r.reference_date
+           OR (p.reference_date = r.reference_date AND d.snapshot_id > s.snapshot_id)
+    """)
+
+    con.execute("BEGIN TRANSACTION")
+    con.execute("DELETE FROM stg_job_postings WHERE job_key IN (SELECT job_key FROM stg_upsert)")
+    con.execute("INSERT INTO stg_job_postings BY NAME SELECT * FROM stg_upsert")
+    _record_staged(con, pending)
+    con.execute("COMMIT")
+    return con.execute("SELECT COUNT(*) FROM stg_upsert").fetchone()[0]
+
+def build_staging(con: duckdb.DuckDBPyConnection, engine: str = "sql", incremental: bool = False) -> int:
+    """(Re)build or incrementally update stg_job_postings; returns its row count."""
+    create_types(con)
+    upserted = normalize_incremental(con) if incremental and engine == "sql" else None
+    if upserted is not None:
+        print(f"Incremental: upserted {upserted:,} rows")
+    else:
+        if incremental:
+            print("Incremental: no staged state to build on (or a staged snapshot changed); full rebuild")
+        if engine == "pandas":
+            out = normalize_pandas(con)
+            con.execute(f"""
+                CREATE OR REPLACE TABLE stg_job_postings AS
+                SELECT * REPLACE (role_family::{ROLE_FAMILY_TYPE} AS role_family) FROM out
+            """)
+        else:
+            con.execute(f"CREATE OR REPLACE TABLE stg_job_postings AS {normalize_sql()}")
+        con.execute("CREATE OR REPLACE TABLE stg_normalize_state (snapshot_id VARCHAR, checksum VARCHAR, staged_at TIMESTAMP)")
+        _record_staged(con)
+    return con.execute("SELECT COUNT(*) FROM stg_job_postings").fetchone()[0]
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--engine", choices=["sql", "pandas"], default="sql",
+                   help="sql runs normalization inside DuckDB; pandas is the row-wise reference path.")
+    p.add_argument("--check-parity", action="store_true",
+                   help="Compare both engines on raw_job_postings and exit non-zero on any difference.")
+    p.add_argument("--incremental", action="store_true",
+                   help="Only stage snapshots not staged yet and upsert them by job_id (sql engine).")
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of this run (see src.telemetry).")
+    args = p.parse_args()
+
+    con = duckdb.connect(str(DB_PATH))
+    create_types(con)
+
+    if args.check_parity:
+        n_diff = check_parity(con)
+        con.close()
+        raise SystemExit(1 if n_diff else 0)
 
-    con.execute("CREATE OR REPLACE TABLE stg_job_postings AS SELECT * FROM out")
+    n_raw = con.execute("SELECT COUNT(*) FROM raw_job_postings").fetchone()[0]
+    with track(con, "normalize", rows_in=n_raw, profile_dir=args.profile) as run:
+        n_rows = run.rows_out = build_staging(con, args.engine, args.incremental)
+    head = con.execute("SELECT * FROM stg_job_postings LIMIT 3").df()
     con.close()
 
-    print(f"stg_job_postings rows: {len(out):,}")
-    print(out.head(3).to_string(index=False))
+    print(f"stg_job_postings rows: {n_rows:,}")
+    print(head.to_string(index=False))
 
 if __name__ == "__main__":
     main()
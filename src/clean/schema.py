@@ -0,0 +1,128 @@
+import argparse
+import pathlib
+from typing import Iterable, List
+
+import duckdb
+import pandas as pd
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+# Every value normalize's role-family rules can produce. Sorted, so ORDER BY
+# on the ENUM gives the same order as on the old VARCHAR column.
+ROLE_FAMILIES = ["bi", "data_analyst", "data_engineer", "data_scientist", "ml_engineer", "other"]
+ROLE_FAMILY_TYPE = "role_family_t"
+
+# job_skills is a fact table over compact keys; skill and category names live
+# in skill_dim / category_dim, whose ids are append-only so existing rows stay valid.
+JOB_SKILLS_COLUMNS = "job_key UBIGINT, skill_id USMALLINT, category_id USMALLINT"
+
+def job_key_sql(col: str = "job_id") -> str:
+    # job_id is 16 hex chars (a sha256 prefix), i.e. exactly one UBIGINT
+    return f"('0x' || {col})::UBIGINT"
+
+def job_key(job_id: str) -> int:
+    return int(job_id, 16)
+
+def enum_sql(values: Iterable[str]) -> str:
+    quoted = ", ".join("'" + str(v).replace("'", "''") + "'" for v in values)
+    return f"ENUM({quoted})"
+
+def create_types(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute(f"CREATE TYPE IF NOT EXISTS {ROLE_FAMILY_TYPE} AS {enum_sql(ROLE_FAMILIES)}")
+
+def ensure_dims(con: duckdb.DuckDBPyConnection, pairs: pd.DataFrame) -> None:
+    """Add any skill / category in `pairs` (skill, category columns) missing from the dimension tables."""
+    con.execute("CREATE TABLE IF NOT EXISTS skill_dim (skill_id USMALLINT PRIMARY KEY, skill VARCHAR NOT NULL UNIQUE)")
+    con.execute("CREATE TABLE IF NOT EXISTS category_dim (category_id USMALLINT PRIMARY KEY, category VARCHAR NOT NULL UNIQUE)")
+    for name in ["skill", "category"]:
+        con.execute(f"""
+            INSERT INTO {name}_dim
+            SELECT (SELECT coalesce(max({name}_id), 0) FROM {name}_dim) + row_number() OVER (ORDER BY {name}), {name}
+            FROM (SELECT DISTINCT {name} FROM pairs)
+            WHERE {name} NOT IN (SELECT {name} FROM {name}_dim)
+        """)
+
+def create_views(con: duckdb.DuckDBPyConnection) -> None:
+    # Readable job_skills for ad-hoc queries; pipeline stages join the dims themselves
+    con.execute("""
+        CREATE OR REPLACE VIEW job_skills_named AS
+        SELECT js.job_key, sd.skill, cd.category
+        FROM job_skills js
+        JOIN skill_dim sd ON sd.skill_id = js.skill_id
+        JOIN category_dim cd ON cd.category_id = js.category_id
+    """)
+
+def table_columns(con: duckdb.DuckDBPyConnection, table: str) -> List[str]:
+    sql = "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position"
+    return [r[0] for r in con.execute(sql, [table]).fetchall()]
+
+def migrate(con: duckdb.DuckDBPyConnection) -> List[str]:
+    """
+    Rebuild tables written before the compact schema in place; returns what changed.
+
+    Each step only runs on a table that still has its old layout, so running
+    the migration twice is a no-op.
+    """
+    done = []
+    create_types(con)
+
+    if "job_id" in table_columns(con, "stg_job_postings") and "job_key" not in table_columns(con, "stg_job_postings"):
+        con.execute(f"""
+            CREATE OR REPLACE TABLE stg_job_postings AS
+            SELECT {job_key_sql()} AS job_key, * REPLACE (role_family::{ROLE_FAMILY_TYPE} AS role_family)
+            FROM stg_job_postings
+        """)
+        done.append("stg_job_postings: + job_key UBIGINT, role_family -> ENUM")
+
+    if "skill" in table_columns(con, "job_skills"):
+        pairs = con.execute("SELECT DISTINCT skill, category FROM job_skills").df()
+        ensure_dims(con, pairs)
+        con.execute(f"""
+            CREATE OR REPLACE TABLE job_skills AS
+            SELECT {job_key_sql('js.job_id')} AS job_key, sd.skill_id, cd.category_id
+            FROM job_skills js
+            JOIN skill_dim sd ON sd.skill = js.skill
+            JOIN category_dim cd ON cd.category = js.category
+            ORDER BY ALL
+        """)
+        create_views(con)
+        done.append("job_skills: (job_id, skill, category) -> (job_key, skill_id, category_id)")
+
+    if "job_id" in table_columns(con, "job_skills_posting_state"):
+        con.execute(f"""
+            CREATE OR REPLACE TABLE job_skills_posting_state AS
+            SELECT {job_key_sql()} AS job_key, content_hash FROM job_skills_posting_state
+        """)
+        done.append("job_skills_posting_state: job_id -> job_key")
+
+    if "posting_id" in table_columns(con, "pred_role_family"):
+        labels = [r[0] for r in con.execute(
+            "SELECT DISTINCT pred_role_family FROM pred_role_family WHERE pred_role_family IS NOT NULL ORDER BY 1"
+        ).fetchall()]
+        con.execute(f"""
+            CREATE OR REPLACE TABLE pred_role_family AS
+            SELECT {job_key_sql('posting_id')} AS job_key,
+                   pred_role_family::{enum_sql(labels)} AS pred_role_family,
+                   pred_confidence
+            FROM pred_role_family
+        """)
+        done.append("pred_role_family: posting_id -> job_key, pred_role_family -> ENUM")
+    return done
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Migrate a warehouse built before the compact keyed schema.")
+    p.add_argument("--db", default=str(DB_PATH))
+    args = p.parse_args()
+
+    con = duckdb.connect(args.db)
+    con.execute("BEGIN TRANSACTION")
+    done = migrate(con)
+    con.execute("COMMIT")
+    con.execute("CHECKPOINT")
+    con.close()
+
+    print("\n".join(done) if done else "Already on the compact schema; nothing to migrate")
+
+if __name__ == "__main__":
+    main()
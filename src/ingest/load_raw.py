@@ -1,23 +1,267 @@
+import argparse
+import csv
+import glob
+import hashlib
 import pathlib
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List
+
 import duckdb
 import pandas as pd
+import pyarrow as pa
+
+from src.telemetry import peak_rss_mb, track
 
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
 RAW_PATH = REPO_ROOT / "data" / "raw" / "job_postings.csv"
 DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
 
-def main() -> None:
-    if not RAW_PATH.exists():
-        raise FileNotFoundError(f"Raw file not found: {RAW_PATH}")
+# The original dataset is a snapshot from Nov 20, 2022 (per Kaggle description);
+# used for files that have neither a manifest entry nor a date in their name.
+DEFAULT_REFERENCE_DATE = date(2022, 11, 20)
+MANIFEST_NAME = "manifest.csv"
+# YYYY-MM-DD or YYYYMMDD, not inside a longer run of digits
+FILENAME_DATE = re.compile(r"(?<!\d)(20\d{2})-?(0[1-9]|1[0-2])-?([0-3]\d)(?!\d)")
+
+@dataclass
+class Snapshot:
+    snapshot_id: str
+    path: pathlib.Path
+    reference_date: date
+    checksum: str = ""
+
+def file_checksum(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _read_manifest(path: pathlib.Path) -> Dict[str, date]:
+    # manifest.csv: file,reference_date (YYYY-MM-DD); file is a name or a path
+    with open(path, newline="", encoding="utf-8") as f:
+        return {
+            pathlib.Path(row["file"]).name: date.fromisoformat(row["reference_date"].strip())
+            for row in csv.DictReader(f)
+        }
+
+def _filename_date(stem: str) -> date | None:
+    """First valid date in a file stem; digit runs that aren't a real date (e.g. 20221131) are ignored."""
+    for m in FILENAME_DATE.finditer(stem):
+        try:
+            return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        except ValueError:
+            continue
+    return None
+
+def discover_snapshots(
+    raw: str,
+    manifest: str | None = None,
+    default_reference_date: date = DEFAULT_REFERENCE_DATE,
+) -> List[Snapshot]:
+    """Resolve a file, directory or glob into snapshots with their reference dates."""
+    p = pathlib.Path(raw)
+    if p.is_dir():
+        paths = sorted(p.glob("*.csv"))
+        manifest_path = pathlib.Path(manifest) if manifest else p / MANIFEST_NAME
+    else:
+        paths = sorted(pathlib.Path(x) for x in glob.glob(raw)) if glob.has_magic(raw) else [p]
+        manifest_path = pathlib.Path(manifest) if manifest else None
+    paths = [x for x in paths if x.name != MANIFEST_NAME]
+    if not paths or not all(x.exists() for x in paths):
+        raise FileNotFoundError(f"Raw file not found: {raw}")
+
+    dates = _read_manifest(manifest_path) if manifest_path and manifest_path.exists() else {}
+    snapshots = []
+    for path in paths:
+        ref = dates.get(path.name) or _filename_date(path.stem)
+        snapshots.append(Snapshot(path.stem, path, ref or default_reference_date))
+    if len({s.snapshot_id for s in snapshots}) != len(snapshots):
+        raise ValueError("Snapshot files must have unique names (the file stem is the snapshot_id).")
+    return snapshots
+
+def _csv_source(path: pathlib.Path) -> str:
+    return f"read_csv('{path.as_posix()}', header=true, all_varchar=true)"
+
+def _csv_select(con: duckdb.DuckDBPyConnection, path: pathlib.Path) -> str:
+    """
+    SELECT over DuckDB's CSV reader that yields the same columns pandas would.
+
+    Every column is read as VARCHAR so a late row can't break a type guessed
+    from the first sample; Rating is cast back to DOUBLE and the unnamed index
+    column is renamed to pandas' "Unnamed: 0".
+    """
+    src = _csv_source(path)
+    cols = [r[0] for r in con.execute(f"DESCRIBE SELECT * FROM {src}").fetchall()]
+    exprs = []
+    for i, c in enumerate(cols):
+        if i == 0 and c == "column0":
+            exprs.append('TRY_CAST(column0 AS BIGINT) AS "Unnamed: 0"')
+        elif c == "Rating":
+            exprs.append('TRY_CAST("Rating" AS DOUBLE) AS "Rating"')
+        else:
+            exprs.append(f'"{c}"')
+    return f"SELECT {', '.join(exprs)} FROM {src}"
+
+def _prepare_tables(con: duckdb.DuckDBPyConnection, pending: List[Snapshot], full_refresh: bool) -> None:
+    tables = {r[0] for r in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    raw_cols = {r[0] for r in con.execute("DESCRIBE raw_job_postings").fetchall()} if "raw_job_postings" in tables else set()
+    # Tables written before snapshots existed can't be merged into; start over.
+    if full_refresh or "raw_snapshots" not in tables or "snapshot_id" not in raw_cols:
+        con.execute("""
+            CREATE OR REPLACE TABLE raw_snapshots (
+                snapshot_id VARCHAR,
+                file_path VARCHAR,
+                checksum VARCHAR,
+                reference_date DATE,
+                row_count BIGINT,
+                loaded_at TIMESTAMP
+            )
+        """)
+        con.execute("DROP TABLE IF EXISTS raw_job_postings")
+        raw_cols = set()
 
-    df = pd.read_csv(RAW_PATH)
-    print(f"Loaded raw rows: {len(df):,} | cols: {len(df.columns)}")
-    print("Columns:", list(df.columns))
+    # Widen raw_job_postings up front so the concurrent loads can all append BY NAME.
+    for snap in pending:
+        schema = con.execute(f"DESCRIBE {_csv_select(con, snap.path)}").fetchall()
+        if not raw_cols:
+            cols = ", ".join(f'"{name}" {dtype}' for name, dtype, *_ in schema)
+            con.execute(f"""
+                CREATE TABLE raw_job_postings (
+                    {cols}, snapshot_id VARCHAR, reference_date DATE, source_row BIGINT
+                )
+            """)
+            raw_cols = {name for name, *_ in schema} | {"snapshot_id", "reference_date", "source_row"}
+            continue
+        for name, dtype, *_ in schema:
+            if name not in raw_cols:
+                con.execute(f'ALTER TABLE raw_job_postings ADD COLUMN "{name}" {dtype}')
+                raw_cols.add(name)
 
+def _with_lineage(batch: pa.RecordBatch, snap: Snapshot, offset: int) -> pa.RecordBatch:
+    n = batch.num_rows
+    return (
+        batch
+        .append_column("snapshot_id", pa.array([snap.snapshot_id] * n, pa.string()))
+        .append_column("reference_date", pa.array([snap.reference_date] * n, pa.date32()))
+        .append_column("source_row", pa.array(range(offset, offset + n), pa.int64()))
+    )
+
+def ingest_stream(con: duckdb.DuckDBPyConnection, snap: Snapshot, batch_size: int) -> int:
+    """Append one CSV to raw_job_postings as Arrow record batches of at most batch_size rows."""
+    reader = con.cursor()
+    result = reader.execute(_csv_select(con, snap.path))
+    # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+    to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+
+    n_rows = 0
+    for raw_batch in to_reader(batch_size):
+        batch = _with_lineage(raw_batch, snap, n_rows)
+        con.execute("INSERT INTO raw_job_postings BY NAME SELECT * FROM batch")
+        n_rows += batch.num_rows
+    reader.close()
+    return n_rows
+
+def ingest_pandas(con: duckdb.DuckDBPyConnection, snap: Snapshot) -> int:
+    df = pd.read_csv(snap.path)
+    df["snapshot_id"] = snap.snapshot_id
+    df["reference_date"] = snap.reference_date
+    df["source_row"] = range(len(df))
+    con.execute("INSERT INTO raw_job_postings BY NAME SELECT * FROM df")
+    return len(df)
+
+def load_snapshot(con: duckdb.DuckDBPyConnection, snap: Snapshot, mode: str, batch_size: int) -> int:
+    """Replace one snapshot's rows in a single transaction; safe to run from several threads."""
+    cur = con.cursor()
+    cur.execute("BEGIN TRANSACTION")
+    try:
+        cur.execute("DELETE FROM raw_job_postings WHERE snapshot_id = ?", [snap.snapshot_id])
+        cur.execute("DELETE FROM raw_snapshots WHERE snapshot_id = ?", [snap.snapshot_id])
+        n_rows = ingest_pandas(cur, snap) if mode == "pandas" else ingest_stream(cur, snap, batch_size)
+        cur.execute(
+            "INSERT INTO raw_snapshots VALUES (?, ?, ?, ?, ?, current_timestamp)",
+            [snap.snapshot_id, str(snap.path), snap.checksum, snap.reference_date, n_rows],
+        )
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    finally:
+        cur.close()
+    return n_rows
+
+def ingest_snapshots(
+    con: duckdb.DuckDBPyConnection,
+    snapshots: List[Snapshot],
+    mode: str = "stream",
+    batch_size: int = 100_000,
+    workers: int = 4,
+    full_refresh: bool = False,
+) -> int:
+    """Load the snapshots not ingested yet (by snapshot_id + checksum); returns the number of new rows."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for snap, checksum in zip(snapshots, pool.map(lambda s: file_checksum(s.path), snapshots)):
+            snap.checksum = checksum
+
+    loaded = set()
+    if not full_refresh:
+        try:
+            loaded = set(con.execute("SELECT snapshot_id, checksum FROM raw_snapshots").fetchall())
+        except duckdb.CatalogException:
+            pass
+    pending = [s for s in snapshots if (s.snapshot_id, s.checksum) not in loaded]
+    for s in snapshots:
+        if s not in pending:
+            print(f"skip {s.snapshot_id}: already ingested (checksum {s.checksum[:12]})")
+
+    start = time.perf_counter()
+    n_rows = 0
+    if pending:
+        _prepare_tables(con, pending, full_refresh)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(lambda s: load_snapshot(con, s, mode, batch_size), pending)
+            for snap, count in zip(pending, counts):
+                print(f"loaded {snap.snapshot_id}: {count:,} rows (reference date {snap.reference_date})")
+                n_rows += count
+    elapsed = time.perf_counter() - start
+    n_total = con.execute("SELECT COUNT(*) FROM raw_job_postings").fetchone()[0] if pending or loaded else 0
+
+    size_mb = sum(s.path.stat().st_size for s in pending) / (1024 * 1024)
+    rss = peak_rss_mb()
+    print(f"Loaded {len(pending)} of {len(snapshots)} snapshot(s): {n_rows:,} new rows | raw_job_postings rows: {n_total:,}")
+    print(
+        f"{elapsed:.2f}s | {n_rows / max(elapsed, 1e-9):,.0f} rows/s | {size_mb / max(elapsed, 1e-9):,.1f} MB/s"
+        + (f" | peak RSS {rss:,.0f} MB" if rss is not None else "")
+    )
+    return n_rows
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--raw", default=str(RAW_PATH), help="CSV file, directory of CSVs, or glob of snapshot files.")
+    p.add_argument("--manifest", default=None,
+                   help=f"CSV of file,reference_date (defaults to {MANIFEST_NAME} inside a --raw directory).")
+    p.add_argument("--reference-date", type=date.fromisoformat, default=DEFAULT_REFERENCE_DATE,
+                   help="Reference date for files with no manifest entry and no date in their name.")
+    p.add_argument("--mode", choices=["stream", "pandas"], default="stream",
+                   help="stream copies bounded Arrow batches via DuckDB's CSV reader; pandas loads whole files.")
+    p.add_argument("--batch-size", type=int, default=100_000, help="Rows per batch in stream mode.")
+    p.add_argument("--workers", type=int, default=4, help="Snapshot files loaded concurrently.")
+    p.add_argument("--memory-limit", default=None, help="Optional DuckDB memory_limit, e.g. 2GB.")
+    p.add_argument("--full-refresh", action="store_true", help="Drop all loaded snapshots and reload every file.")
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of this run (see src.telemetry).")
+    args = p.parse_args()
+
+    snapshots = discover_snapshots(args.raw, args.manifest, args.reference_date)
     con = duckdb.connect(str(DB_PATH))
-    con.execute("CREATE OR REPLACE TABLE raw_job_postings AS SELECT * FROM df")
+    if args.memory_limit:
+        con.execute(f"SET memory_limit = '{args.memory_limit}'")
+    with track(con, "ingest", profile_dir=args.profile) as run:
+        run.rows_out = ingest_snapshots(con, snapshots, args.mode, args.batch_size, args.workers, args.full_refresh)
     con.close()
-
     print(f"Wrote DuckDB table raw_job_postings to {DB_PATH}")
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+import argparse
+import csv
+import pathlib
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.nlp.extract_skills import load_skills
+from src.parallel import bounded_map
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+OUT_DIR = REPO_ROOT / "data" / "synthetic"
+COLUMNS = ["", "Title", "Company", "Location", "Rating", "Date", "Salary", "Description", "Links", "Descriptions"]
+
+# (title, weight, skill categories the description leans on)
+ROLES = [
+    ("Data Engineer", 14, ["data_engineering", "cloud", "languages", "databases"]),
+    ("Data Analyst", 12, ["analytics_tools", "languages", "visualization"]),
+    ("Business Analyst", 10, ["analytics_tools", "languages"]),
+    ("Data Scientist", 10, ["ml_tools", "languages", "visualization"]),
+    ("Machine Learning Engineer", 10, ["ml_tools", "cloud", "languages"]),
+    ("Business Intelligence Developer", 6, ["analytics_tools", "databases", "visualization"]),
+    ("Business Intelligence Analyst", 4, ["analytics_tools", "visualization"]),
+    ("Analytics Engineer", 5, ["data_engineering", "analytics_tools", "languages"]),
+    ("Database Administrator", 4, ["databases", "cloud"]),
+    ("Software Engineer, Data Platform", 5, ["data_engineering", "orchestration_ci", "cloud"]),
+    ("Data Architect", 3, ["data_engineering", "databases", "cloud"]),
+    ("Research Scientist", 2, ["ml_tools", "languages"]),
+]
+SENIORITY = ["", "", "", "Senior ", "Lead ", "Staff ", "Junior ", "Principal "]
+
+CITIES = [
+    "New York, NY", "San Francisco, CA", "Seattle, WA", "Austin, TX", "Chicago, IL", "Boston, MA",
+    "Los Angeles, CA", "Denver, CO", "Atlanta, GA", "Washington, DC", "Dallas, TX", "Houston, TX",
+    "Phoenix, AZ", "San Diego, CA", "San Jose, CA", "Portland, OR", "Minneapolis, MN", "Charlotte, NC",
+    "Raleigh, NC", "Pittsburgh, PA", "Philadelphia, PA", "Columbus, OH", "Nashville, TN", "Miami, FL",
+    "Salt Lake City, UT", "Detroit, MI", "St. Louis, MO", "Kansas City, MO", "Madison, WI", "Richmond, VA",
+]
+
+# Shapes seen in the real snapshot's Date column; N is filled in per row
+DATE_FORMATS = [
+    ("PostedToday", 8), ("Today", 8), ("Just posted", 7), ("{n} days ago", 25), ("1 day ago", 8),
+    ("Active {n} days ago", 12), ("EmployerActive {n} days ago", 12), ("30+ days ago", 10), ("{iso}", 10),
+]
+
+SKILL_SENTENCES = [
+    "Hands-on experience with {a} and {b} is required.",
+    "You will build and maintain pipelines using {a}.",
+    "Strong proficiency in {a}; exposure to {b} is a plus.",
+    "Our stack includes {a}, {b} and {c}.",
+    "Familiarity with {a} in a production environment.",
+    "Experience designing solutions on {a} and {b}.",
+    "Nice to have: {a}.",
+    "You will partner with stakeholders to deliver insights using {a}.",
+]
+FILLER = [
+    "We are a fast-growing company on a mission to make data accessible to everyone.",
+    "As part of our team you will collaborate with product, engineering and business partners.",
+    "You will own projects end to end, from gathering requirements to shipping results.",
+    "We value curiosity, ownership and clear communication.",
+    "This role reports to the head of data and works closely with leadership.",
+    "Responsibilities include writing documentation, reviewing code and mentoring peers.",
+    "The ideal candidate is comfortable working with ambiguous problems and large datasets.",
+    "We offer competitive compensation, equity and comprehensive health benefits.",
+    "Bachelor's degree in Computer Science, Statistics, Mathematics or a related field.",
+    "3+ years of relevant professional experience.",
+    "Excellent written and verbal communication skills.",
+    "You will define metrics, build dashboards and run experiments.",
+    "Ensure data quality, reliability and security across our platform.",
+    "Work in an agile environment with two-week sprints.",
+    "We are an equal opportunity employer and value diversity at our company.",
+    "Flexible working hours and a remote-friendly culture.",
+    "Translate business questions into analytical frameworks.",
+    "Participate in on-call rotations for critical data services.",
+    "Optimize performance of queries and data models at scale.",
+    "Present findings to technical and non-technical audiences.",
+]
+BANK_SIZE = 256
+AVG_SENTENCE_LEN = 65
+
+def parse_count(s: str) -> int:
+    """'10k' -> 10_000, '2.5M' -> 2_500_000, '500' -> 500."""
+    s = s.strip().lower().replace("_", "")
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def _chunk(task: tuple) -> pd.DataFrame:
+    start, n, seed, skills, reference = task
+    # One generator per chunk, so the output doesn't depend on --workers
+    rng = np.random.default_rng([seed, start])
+
+    weights = np.array([w for _, w, _ in ROLES], dtype=float)
+    role_idx = rng.choice(len(ROLES), size=n, p=weights / weights.sum())
+    seniority = rng.choice(SENIORITY, size=n)
+    # about 1 in 4 titles keeps the trailing whitespace / newline the scraper leaves
+    title_tail = np.where(rng.random(n) < 0.25, "  \n", "")
+    titles = [f"{s}{ROLES[r][0]}{t}" for s, r, t in zip(seniority, role_idx, title_tail)]
+
+    # Company sizes follow a Zipf-like curve: a few employers post many jobs
+    n_companies = max(50, (start + n) // 20)
+    companies = [f"Co {k}" for k in np.minimum(rng.zipf(1.3, size=n), n_companies)]
+
+    cities = rng.choice(CITIES, size=n)
+    loc_kind = rng.random(n)
+    extra = rng.integers(1, 6, size=n)
+    locations = [
+        "Remote" if u < 0.25 else
+        f"Remote in {c}" if u < 0.35 else
+        f"+{e} location{'s' if e > 1 else ''}Remote" if u < 0.42 else
+        f"Hybrid remote in {c}" if u < 0.5 else c
+        for u, c, e in zip(loc_kind, cities, extra)
+    ]
+
+    ratings = np.where(rng.random(n) < 0.35, np.nan, rng.choice([3.5, 4.0], size=n))
+
+    date_weights = np.array([w for _, w in DATE_FORMATS], dtype=float)
+    date_idx = rng.choice(len(DATE_FORMATS), size=n, p=date_weights / date_weights.sum())
+    days = rng.integers(2, 30, size=n)
+    dates = [
+        DATE_FORMATS[i][0].format(n=d, iso=(reference - timedelta(days=int(d))).isoformat())
+        for i, d in zip(date_idx, days)
+    ]
+
+    salary_k = rng.integers(6, 26, size=n) * 10
+    salaries = [None if u < 0.5 else f"${k},000 a year" for u, k in zip(rng.random(n), salary_k)]
+
+    # Descriptions: filler plus skill sentences drawn mostly from the role's
+    # categories, sized like the real snapshot (median ~3.7k chars, long tail).
+    # Sentences are picked in one vectorised draw from a per-role bank rendered
+    # once per chunk; a per-sentence Python loop tops out around 1.5k rows/s.
+    all_skills = np.array([s for items in skills.values() for s in items])
+    banks = np.empty((len(ROLES), BANK_SIZE), dtype=object)
+    for r, (_, _, categories) in enumerate(ROLES):
+        pool = np.array([s for c in categories for s in skills.get(c, [])]) if categories else all_skills
+        for j in range(BANK_SIZE):
+            picks = rng.choice(pool if j % 8 else all_skills, size=3)
+            banks[r, j] = SKILL_SENTENCES[j % len(SKILL_SENTENCES)].format(a=picks[0], b=picks[1], c=picks[2])
+    filler = np.array(FILLER, dtype=object)
+
+    target_len = np.clip(rng.lognormal(8.2, 0.5, size=n), 200, 25_000)
+    counts = np.maximum(1, (target_len / AVG_SENTENCE_LEN).astype(np.int64))
+    owner_role = np.repeat(role_idx, counts)
+    total = int(counts.sum())
+    sentences = np.where(
+        rng.random(total) < 0.3,
+        banks[owner_role, rng.integers(BANK_SIZE, size=total)],
+        filler[rng.integers(len(FILLER), size=total)],
+    )
+    ends = np.cumsum(counts)
+    descriptions = [
+        f"We're hiring a {title.strip()}. " + " ".join(sentences[end - k:end])
+        for title, k, end in zip(titles, counts, ends)
+    ]
+
+    return pd.DataFrame({
+        "": np.arange(start, start + n),
+        "Title": titles,
+        "Company": companies,
+        "Location": locations,
+        "Rating": ratings,
+        "Date": dates,
+        "Salary": salaries,
+        "Description": [d[:200] for d in descriptions],
+        "Links": [f"https://indeed.com/job/synthetic-{seed}-{i}" for i in range(start, start + n)],
+        "Descriptions": descriptions,
+    }, columns=COLUMNS)
+
+def generate(
+    out: pathlib.Path,
+    rows: int,
+    seed: int = 42,
+    chunk_size: int = 50_000,
+    workers: int = 1,
+    reference: date = date(2022, 11, 20),
+) -> int:
+    """Write an Indeed-shaped job_postings.csv with `rows` synthetic postings; returns bytes written."""
+    skills: Dict[str, List[str]] = load_skills()
+    tasks = [(start, min(chunk_size, rows - start), seed, skills, reference) for start in range(0, rows, chunk_size)]
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(".csv.partial")
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        # Chunks are generated in parallel but written in order, a few at a time
+        for i, df in enumerate(bounded_map(_chunk, tasks, workers=workers)):
+            df.to_csv(f, index=False, header=(i == 0), quoting=csv.QUOTE_MINIMAL)
+    tmp.replace(out)
+    return out.stat().st_size
+
+def default_path(rows: int, seed: int) -> pathlib.Path:
+    return OUT_DIR / f"rows_{rows}_seed_{seed}" / "job_postings.csv"
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Generate a synthetic Indeed-shaped job_postings.csv.")
+    p.add_argument("--rows", default="10k", help="Number of postings, e.g. 10k, 1M, 10M.")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", default=None, help="Output CSV (default data/synthetic/rows_<n>_seed_<seed>/job_postings.csv).")
+    p.add_argument("--chunk-size", type=int, default=50_000, help="Rows generated per task.")
+    p.add_argument("--workers", type=int, default=1, help="Processes generating chunks.")
+    args = p.parse_args()
+
+    rows = parse_count(args.rows)
+    out = pathlib.Path(args.out) if args.out else default_path(rows, args.seed)
+    start = time.perf_counter()
+    size = generate(out, rows, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {rows:,} postings to {out} ({size / 1024 ** 2:,.1f} MB) in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"Load it with: python -m src.ingest.load_raw --raw {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Compact export of the role-family model and a scorer that loads it quickly.
+
+The exported directory holds the sorted vocabulary, idf and coefficients as
+.npy files (memory-mapped on load) plus a small manifest.json with the
+analyzer settings. Scoring needs only numpy: pandas, joblib and sklearn are
+imported by the export step alone.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import pathlib
+import re
+import time
+
+import numpy as np
+
+DEFAULT_OUT = "models/role_family_compact"
+FORMAT = 1
+
+
+def export_compact(model_path: str, out_dir: str, dtype: str = "float32") -> dict:
+    """Write a TF-IDF + linear classifier Pipeline (joblib) as a compact model directory."""
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+
+    pipe = joblib.load(model_path)
+    vec, clf = pipe[0], pipe[-1]
+    if not isinstance(vec, TfidfVectorizer) or vec.analyzer != "word" or vec.tokenizer or vec.preprocessor \
+            or vec.strip_accents or vec.binary or not vec.use_idf:
+        raise SystemExit("Only pipelines starting with a default word-level TfidfVectorizer can be exported.")
+    if not hasattr(clf, "coef_"):
+        raise SystemExit("Only linear classifiers (with coef_) can be exported.")
+
+    # Probabilities are reproduced for the classifiers whose predict_proba is a
+    # closed form of the decision function; other models get labels only.
+    if isinstance(clf, LogisticRegression):
+        proba = "sigmoid" if len(clf.classes_) <= 2 else "softmax"
+    elif isinstance(clf, SGDClassifier) and clf.loss == "log_loss":
+        proba = "sigmoid" if len(clf.classes_) <= 2 else "ovr"
+    else:
+        proba = None
+
+    terms = vec.get_feature_names_out()  # sorted, matching the column order
+    out = pathlib.Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    # UTF-8 bytes sort in code point order, so the array stays sorted as terms are
+    np.save(out / "vocab.npy", np.array([t.encode("utf-8") for t in terms], dtype=bytes))
+    np.save(out / "idf.npy", vec.idf_.astype(np.float64))
+    np.save(out / "coef.npy", np.ascontiguousarray(clf.coef_.T, dtype=dtype))
+    np.save(out / "intercept.npy", np.asarray(clf.intercept_, dtype=np.float64))
+
+    with open(model_path, "rb") as f:
+        source_sha256 = hashlib.sha256(f.read()).hexdigest()
+    manifest = {
+        "format": FORMAT,
+        "classes": [str(c) for c in clf.classes_],
+        "lowercase": vec.lowercase,
+        "token_pattern": vec.token_pattern,
+        "ngram_range": list(vec.ngram_range),
+        "stop_words": sorted(vec.get_stop_words() or []),
+        "norm": vec.norm,
+        "smooth_idf": vec.smooth_idf,
+        "sublinear_tf": vec.sublinear_tf,
+        "proba": proba,
+        "dtype": dtype,
+        "source": str(model_path),
+        "source_sha256": source_sha256,
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+class CompactModel:
+    """
+    Text-in scorer over an exported directory, mirroring the Pipeline API used
+    by predict_role_family (classes_, predict, predict_proba).
+    """
+
+    def __init__(self, path: str):
+        path = pathlib.Path(path)
+        m = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+        if m.get("format") != FORMAT:
+            raise ValueError(f"Unsupported compact model format: {m.get('format')}")
+        self.manifest = m
+        self.classes_ = np.array(m["classes"], dtype=object)
+        self.vocab = np.load(path / "vocab.npy", mmap_mode="r")
+        self.idf = np.load(path / "idf.npy", mmap_mode="r")
+        self.coef = np.load(path / "coef.npy", mmap_mode="r")
+        self.intercept = np.load(path / "intercept.npy")
+        self._token = re.compile(m["token_pattern"])
+        self._stop = frozenset(m["stop_words"])
+
+    @property
+    def predict_proba(self):
+        # Absent (hasattr is False) when the source model had no closed-form
+        # probabilities, so predict_role_family falls back to predict()
+        if self.manifest["proba"] is None:
+            raise AttributeError("predict_proba is not available for this model")
+        return self._predict_proba
+
+    def _ngrams(self, text: str) -> list:
+        # Same steps as sklearn's word analyzer: lowercase, tokenize, drop stop
+        # words, then join n consecutive tokens with a space
+        if self.manifest["lowercase"]:
+            text = text.lower()
+        tokens = [t for t in self._token.findall(text) if t not in self._stop]
+        lo, hi = self.manifest["ngram_range"]
+        grams = list(tokens) if lo == 1 else []
+        for n in range(max(lo, 2), min(hi, len(tokens)) + 1):
+            grams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return grams
+
+    def decision_function(self, texts) -> np.ndarray:
+        texts = list(texts)
+        docs, grams = [], []
+        for i, text in enumerate(texts):
+            g = self._ngrams(text)
+            grams.extend(g)
+            docs.extend([i] * len(g))
+        scores = np.tile(self.intercept, (len(texts), 1))
+        if grams:
+            grams = np.array([g.encode("utf-8") for g in grams], dtype=bytes)
+            cols = np.searchsorted(self.vocab, grams)
+            cols[cols >= len(self.vocab)] = 0
+            hit = self.vocab[cols] == grams
+            docs, cols = np.asarray(docs)[hit], cols[hit]
+
+            # term counts per (doc, col), then tf-idf weights and row norms
+            pairs, tf = np.unique(docs.astype(np.int64) * len(self.vocab) + cols, return_counts=True)
+            docs, cols = pairs // len(self.vocab), pairs % len(self.vocab)
+            w = tf.astype(np.float64)
+            if self.manifest["sublinear_tf"]:
+                w = np.log(w) + 1
+            w *= self.idf[cols]
+            if self.manifest["norm"] == "l2":
+                norms = np.sqrt(np.bincount(docs, weights=w * w, minlength=len(texts)))
+                w /= norms[docs]
+            elif self.manifest["norm"] == "l1":
+                w /= np.bincount(docs, weights=np.abs(w), minlength=len(texts))[docs]
+            contrib = np.asarray(self.coef[cols], dtype=np.float64) * w[:, None]
+            for k in range(scores.shape[1]):
+                scores[:, k] += np.bincount(docs, weights=contrib[:, k], minlength=len(texts))
+        return scores[:, 0] if scores.shape[1] == 1 else scores
+
+    def _predict_proba(self, texts) -> np.ndarray:
+        d = self.decision_function(texts)
+        if d.ndim == 1:
+            p = 1 / (1 + np.exp(-d))
+            return np.column_stack([1 - p, p])
+        if self.manifest["proba"] == "softmax":
+            e = np.exp(d - d.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        # one-vs-rest: per-class sigmoids renormalized, as in sklearn's _predict_proba_lr
+        p = 1 / (1 + np.exp(-d))
+        total = p.sum(axis=1, keepdims=True)
+        return np.divide(p, total, out=np.full_like(p, 1 / p.shape[1]), where=total != 0)
+
+    def predict(self, texts) -> np.ndarray:
+        d = self.decision_function(texts)
+        idx = (d > 0).astype(int) if d.ndim == 1 else d.argmax(axis=1)
+        return self.classes_[idx]
+
+
+def load_compact(path: str) -> CompactModel:
+    return CompactModel(path)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--model", default="models/role_family_clf.joblib")
+    p.add_argument("--out", default=DEFAULT_OUT)
+    p.add_argument("--dtype", choices=["float32", "float64"], default="float32", help="Coefficient precision.")
+    p.add_argument("--check-db", default=None, help="DuckDB file; compare compact vs joblib predictions on it.")
+    p.add_argument("--table", default="stg_job_postings")
+    p.add_argument("--limit", type=int, default=5000)
+    args = p.parse_args()
+
+    manifest = export_compact(args.model, args.out, args.dtype)
+    size_kb = sum(f.stat().st_size for f in pathlib.Path(args.out).iterdir()) / 1024
+    print(f"Exported {args.model} -> {args.out} ({size_kb:,.0f} KB, {args.dtype} coefficients, proba={manifest['proba']})")
+
+    if args.check_db:
+        import joblib
+
+        from .utils import connect_duckdb, fetch_postings, make_text
+
+        con = connect_duckdb(args.check_db)
+        df = fetch_postings(con, args.table, "job_id", "title", "location", "description_full", limit=args.limit)
+        texts = make_text(df)
+        pipe = joblib.load(args.model)
+        compact = load_compact(args.out)
+
+        start = time.perf_counter()
+        ref = pipe.predict(texts)
+        t_ref = time.perf_counter() - start
+        start = time.perf_counter()
+        got = compact.predict(texts)
+        t_got = time.perf_counter() - start
+        print(f"Label agreement on {len(df)} postings: {(ref == got).mean():.4%}")
+        if manifest["proba"]:
+            diff = np.abs(pipe.predict_proba(texts) - compact.predict_proba(texts)).max()
+            print(f"Max |proba difference|: {diff:.2e}")
+        print(f"Batch scoring: joblib {t_ref:.2f}s | compact {t_got:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+from dataclasses import dataclass
+from functools import cached_property
+from numbers import Integral
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+
+from .utils import connect_duckdb, fetch_postings, iter_postings, make_text
+
+DEFAULT_STORE = "warehouse/features/role_family"
+
+# Tokenization shared by the store and by train_role_family's TfidfVectorizer;
+# changing it changes the store config and forces a rebuild.
+ANALYZER_PARAMS = {"stop_words": "english", "ngram_range": (1, 2)}
+# Document-frequency pruning, applied per training split on top of the stored counts
+TFIDF_PARAMS = {"min_df": 2, "max_df": 0.95}
+
+ARRAYS = ["posting_ids", "vocab_bytes", "vocab_offsets", "data", "indices", "indptr"]
+
+
+@dataclass
+class FeatureStore:
+    """
+    Raw term counts for every posting, as persisted by build_feature_store.
+
+    `counts` is a CSR matrix over memory-mapped arrays with one row per posting
+    (rows sorted by posting_id) and one column per term (sorted, as in
+    CountVectorizer). Pruning and IDF weighting are left to fit_tfidf so a
+    training split gets the vocabulary and weights a TfidfVectorizer fitted on
+    it would.
+    """
+
+    path: pathlib.Path
+    posting_ids: np.ndarray
+    terms: list
+    counts: sp.csr_matrix
+    manifest: dict
+
+    def rows(self, posting_ids: Iterable[str]) -> np.ndarray:
+        ids = np.asarray(list(posting_ids), dtype=str)
+        idx = np.searchsorted(self.posting_ids, ids)
+        idx = np.minimum(idx, len(self.posting_ids) - 1)
+        if len(ids) and not (self.posting_ids[idx] == ids).all():
+            raise KeyError("Some postings are not in the feature store; rebuild it.")
+        return idx
+
+    @cached_property
+    def term_orders(self) -> np.ndarray:
+        # n of each n-gram term; the analyzer joins tokens with single spaces
+        return np.fromiter((t.count(" ") + 1 for t in self.terms), dtype=np.int8, count=len(self.terms))
+
+
+def store_config() -> dict:
+    import sklearn
+
+    return {
+        **{k: list(v) if isinstance(v, tuple) else v for k, v in ANALYZER_PARAMS.items()},
+        "sklearn": sklearn.__version__,
+    }
+
+
+def corpus_fingerprint(batches: Iterable[pd.DataFrame]) -> str:
+    """
+    Order-independent fingerprint of (posting_id, make_text) pairs.
+
+    Per-row sha256 prefixes are summed mod 2**64, so the fingerprint can be
+    computed while streaming batches in any order.
+    """
+    total, n = 0, 0
+    for df in batches:
+        for pid, text in zip(df["posting_id"], make_text(df)):
+            digest = hashlib.sha256(f"{pid}\x1f{text}".encode("utf-8")).digest()
+            total = (total + int.from_bytes(digest[:8], "little")) % 2**64
+            n += 1
+    return f"{n}:{total:016x}"
+
+
+def build_feature_store(df: pd.DataFrame, out_dir: str) -> FeatureStore:
+    """Tokenize + count every posting once and persist the result as .npy files."""
+    df = df.sort_values("posting_id", kind="stable").reset_index(drop=True)
+    vec = CountVectorizer(**ANALYZER_PARAMS, dtype=np.int32)
+    counts = vec.fit_transform(make_text(df)).tocsr()
+    counts.sort_indices()
+    terms = vec.get_feature_names_out()
+
+    encoded = [t.encode("utf-8") for t in terms]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    arrays = {
+        "posting_ids": df["posting_id"].to_numpy(dtype=str),
+        "vocab_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "vocab_offsets": offsets,
+        "data": counts.data,
+        "indices": counts.indices.astype(np.int32),
+        "indptr": counts.indptr.astype(np.int64),
+    }
+
+    # Built in a sibling directory and swapped in whole, so an interrupted
+    # rebuild never leaves new arrays next to the previous store's manifest
+    out = pathlib.Path(out_dir)
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.building")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, arr in arrays.items():
+        np.save(tmp / f"{name}.npy", arr)
+    manifest = {
+        "config": store_config(),
+        "corpus": corpus_fingerprint([df]),
+        "shape": list(counts.shape),
+        "nnz": int(counts.nnz),
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+    old = out.with_name(f".{out.name}.{os.getpid()}.old")
+    if out.exists():
+        os.replace(out, old)
+    os.replace(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+    return load_feature_store(out_dir)
+
+
+def load_feature_store(path: str) -> FeatureStore | None:
+    """Memory-map a persisted store; None if it is missing or was built with another config."""
+    path = pathlib.Path(path)
+    if not (path / "manifest.json").exists():
+        return None
+    manifest = json.loads((path / "manifest.json").read_text(encoding="utf-8"))
+    if manifest.get("config") != store_config():
+        return None
+
+    a = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ARRAYS}
+    raw = a["vocab_bytes"].tobytes()
+    offsets = a["vocab_offsets"]
+    terms = [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+    counts = sp.csr_matrix((a["data"], a["indices"], a["indptr"]), shape=tuple(manifest["shape"]), copy=False)
+    return FeatureStore(path, np.asarray(a["posting_ids"]), terms, counts, manifest)
+
+
+def ensure_feature_store(df: pd.DataFrame, path: str) -> FeatureStore:
+    """Load the store at `path`, rebuilding it when the postings text or config changed."""
+    store = load_feature_store(path)
+    if store is not None and store.manifest["corpus"] == corpus_fingerprint([df]):
+        return store
+    # Drop the stale store's memmaps first: Windows can't move files that are still mapped
+    del store
+    return build_feature_store(df, path)
+
+
+def fit_tfidf(
+    store: FeatureStore,
+    rows: np.ndarray,
+    min_df: int | float = TFIDF_PARAMS["min_df"],
+    max_df: int | float = TFIDF_PARAMS["max_df"],
+    ngram_range: tuple[int, int] = ANALYZER_PARAMS["ngram_range"],
+) -> tuple[TfidfVectorizer, sp.csr_matrix]:
+    """
+    Fit TF-IDF on the stored counts of `rows`.
+
+    ngram_range may narrow the stored range (e.g. (1, 1) keeps only unigram
+    columns) but not widen it.
+
+    Returns a TfidfVectorizer that transforms raw text (for the saved pipeline)
+    together with the training matrix. Vocabulary and idf_ are identical to
+    TfidfVectorizer(**ANALYZER_PARAMS, **TFIDF_PARAMS).fit on the same texts;
+    matrix values agree up to float rounding, since fit_transform leaves
+    row indices unsorted and so sums the l2 norm in a different order.
+    """
+    lo, hi = ngram_range
+    stored_lo, stored_hi = ANALYZER_PARAMS["ngram_range"]
+    if lo < stored_lo or hi > stored_hi:
+        raise ValueError(f"ngram_range {ngram_range} is outside the stored range {ANALYZER_PARAMS['ngram_range']}.")
+
+    counts = store.counts[rows]
+    n_doc = counts.shape[0]
+    max_doc = max_df if isinstance(max_df, Integral) else max_df * n_doc
+    min_doc = min_df if isinstance(min_df, Integral) else min_df * n_doc
+    dfs = np.bincount(counts.indices, minlength=counts.shape[1])
+    orders = store.term_orders
+    keep = np.flatnonzero((dfs >= min_doc) & (dfs <= max_doc) & (orders >= lo) & (orders <= hi))
+    if not len(keep):
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    transformer = TfidfTransformer().fit(_select(counts, keep))
+    params = {**ANALYZER_PARAMS, "ngram_range": tuple(ngram_range)}
+    vec = TfidfVectorizer(**params, vocabulary=[store.terms[i] for i in keep])
+    vec.idf_ = transformer.idf_
+    return vec, transformer.transform(_select(counts, keep))
+
+
+def store_columns(store: FeatureStore, vec: TfidfVectorizer) -> np.ndarray | None:
+    """Store column of each term in vec's vocabulary; None if the store lacks any of them."""
+    index = {t: i for i, t in enumerate(store.terms)}
+    vocab = vec.get_feature_names_out()
+    cols = np.fromiter((index.get(t, -1) for t in vocab), dtype=np.int64, count=len(vocab))
+    return None if (cols < 0).any() else cols
+
+
+def transform_rows(store: FeatureStore, vec: TfidfVectorizer, rows: np.ndarray, cols: np.ndarray) -> sp.csr_matrix:
+    """vec.transform(texts of rows), computed from the stored counts (cols from store_columns)."""
+    transformer = TfidfTransformer(
+        norm=vec.norm, use_idf=vec.use_idf, smooth_idf=vec.smooth_idf, sublinear_tf=vec.sublinear_tf
+    )
+    transformer.idf_ = vec.idf_
+    return transformer.transform(_select(store.counts[rows], cols))
+
+
+def _select(counts: sp.csr_matrix, cols: np.ndarray) -> sp.csr_matrix:
+    # float64 with sorted indices, like CountVectorizer output, so downstream
+    # sums (the l2 norm) run in the same order and give bit-identical values
+    X = counts[:, cols].astype(np.float64)
+    X.sort_indices()
+    return X
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", required=True)
+    p.add_argument("--table", default="stg_job_postings")
+
+    # YOUR schema:
+    p.add_argument("--id-col", default="job_id")
+    p.add_argument("--title-col", default="title")
+    p.add_argument("--loc-col", default="location")
+    p.add_argument("--desc-col", default="description_full")
+
+    p.add_argument("--out", default=DEFAULT_STORE)
+    p.add_argument("--check", action="store_true", help="Only report whether the store matches the table.")
+    args = p.parse_args()
+
+    con = connect_duckdb(args.db)
+    cols = dict(table=args.table, id_col=args.id_col, title_col=args.title_col,
+                loc_col=args.loc_col, desc_col=args.desc_col)
+    if args.check:
+        store = load_feature_store(args.out)
+        fresh = store is not None and store.manifest["corpus"] == corpus_fingerprint(
+            iter_postings(con, batch_size=50_000, **cols)
+        )
+        print(f"{args.out}: {'up to date' if fresh else 'stale or missing'}")
+        return
+
+    store = ensure_feature_store(fetch_postings(con, **cols), args.out)
+    print(f"Feature store: {args.out}")
+    print(f"Postings: {store.counts.shape[0]} | terms: {store.counts.shape[1]} | nnz: {store.counts.nnz}")
+
+
+if __name__ == "__main__":
+    main()
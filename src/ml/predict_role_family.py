@@ -1,13 +1,306 @@
 from __future__ import annotations
 
 import argparse
-import joblib
-import pandas as pd
+import hashlib
+import pathlib
+from typing import TYPE_CHECKING
 
-from .utils import connect_duckdb, fetch_postings, make_text
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas and duckdb (via utils, schema and telemetry) are imported by the
+# functions that use them, and joblib/sklearn (and the feature store, which
+# needs them) only when a joblib model is used, so importing this module to
+# load a compact model (src.ml.compact) stays as cheap as importing numpy.
+
+# The cache keeps entries for this many most recently used model fingerprints,
+# so switching between models (e.g. a joblib model and its compact export)
+# doesn't throw away the other model's predictions.
+CACHE_MODELS = 4
+
+# Model used by _score_batch; loaded once per worker process by _init_worker.
+_MODEL = None
+# (store, tfidf step, store columns) when batches are scored from the feature store
+_FEATURES = None
+
+
+def predict_batch(model, df: pd.DataFrame, X=None) -> pd.DataFrame:
+    """Label + confidence for one batch, vectorizing its text (unless X is given) only once."""
+    import pandas as pd
+
+    from .utils import make_text
+
+    if X is None:
+        X = make_text(df)
+    if hasattr(model, "predict_proba"):
+        # argmax of the probabilities is the predicted class, so one
+        # predict_proba call yields both the label and its confidence
+        proba = model.predict_proba(X)
+        pred = model.classes_[proba.argmax(axis=1)]
+        conf = proba.max(axis=1)
+    else:
+        pred = model.predict(X)
+        conf = None
+
+    return pd.DataFrame({
+        "posting_id": df["posting_id"].astype(str),
+        "pred_role_family": pred.astype(str),
+        "pred_confidence": pd.Series(conf, index=df.index, dtype="float64"),
+    })
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    sha256 of the model artifact (every file, for a compact model directory);
+    retraining changes it and so invalidates the cache.
+    """
+    path = pathlib.Path(model_path)
+    h = hashlib.sha256()
+    for f_path in sorted(path.iterdir()) if path.is_dir() else [path]:
+        with open(f_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def load_model(model_path: str):
+    """A joblib Pipeline, or a CompactModel when model_path is an exported directory."""
+    if pathlib.Path(model_path).is_dir():
+        from .compact import load_compact
+
+        return load_compact(model_path)
+    import joblib
+
+    return joblib.load(model_path)
+
+
+def text_hashes(df: pd.DataFrame) -> pd.Series:
+    """sha256 of each posting's make_text output, the text the model actually sees."""
+    from .utils import make_text
+
+    return make_text(df).map(lambda t: hashlib.sha256(t.encode("utf-8")).hexdigest())
+
+
+def _ensure_cache(con, cache_table: str, fingerprint: str) -> None:
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {cache_table} (
+            text_hash VARCHAR,
+            model_fingerprint VARCHAR,
+            pred_role_family VARCHAR,
+            pred_confidence DOUBLE,
+            PRIMARY KEY (text_hash, model_fingerprint)
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {cache_table}_models (
+            model_fingerprint VARCHAR PRIMARY KEY,
+            last_used TIMESTAMP
+        )
+    """)
+    con.execute(f"INSERT OR REPLACE INTO {cache_table}_models VALUES (?, current_timestamp)", [fingerprint])
+    # Least recently used models beyond CACHE_MODELS lose their entries
+    con.execute(f"""
+        DELETE FROM {cache_table}_models WHERE model_fingerprint NOT IN (
+            SELECT model_fingerprint FROM {cache_table}_models ORDER BY last_used DESC LIMIT {int(CACHE_MODELS)}
+        )
+    """)
+    con.execute(f"""
+        DELETE FROM {cache_table}
+        WHERE model_fingerprint NOT IN (SELECT model_fingerprint FROM {cache_table}_models)
+    """)
+
+
+def _attach_cached(con, batches, cache_table: str, fingerprint: str):
+    # Adds text_hash plus cached_label/cached_confidence (null on a cache miss)
+    for df in batches:
+        df["text_hash"] = text_hashes(df)
+        con.register("batch_hashes", df[["text_hash"]].drop_duplicates())
+        hits = con.execute(f"""
+            SELECT c.text_hash, c.pred_role_family AS cached_label, c.pred_confidence AS cached_confidence
+            FROM {cache_table} c
+            JOIN batch_hashes b USING (text_hash)
+            WHERE c.model_fingerprint = ?
+        """, [fingerprint]).df()
+        con.unregister("batch_hashes")
+        yield df.merge(hits, on="text_hash", how="left")
+
+
+def _init_worker(model_path: str, feature_store: str | None = None) -> None:
+    global _MODEL, _FEATURES
+    _MODEL = load_model(model_path)
+    _FEATURES = None
+    if not feature_store or not hasattr(_MODEL, "named_steps"):
+        return
+    from .features import load_feature_store, store_columns
+
+    store = load_feature_store(feature_store)
+    if store is not None and "tfidf" in _MODEL.named_steps:
+        vec = _MODEL.named_steps["tfidf"]
+        cols = store_columns(store, vec)
+        if cols is not None:
+            _FEATURES = (store, vec, cols)
+
+
+def _predict(df: pd.DataFrame) -> pd.DataFrame:
+    if _FEATURES is not None:
+        store, vec, cols = _FEATURES
+        try:
+            rows = store.rows(df["posting_id"])
+        except KeyError:
+            return predict_batch(_MODEL, df)
+        # Skip tokenization: TF-IDF from the stored counts, then the classifier step
+        from .features import transform_rows
+
+        return predict_batch(_MODEL[-1], df, transform_rows(store, vec, rows, cols))
+    return predict_batch(_MODEL, df)
+
+
+def _score_batch(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame | None]:
+    """Predictions for a batch plus the newly scored rows to cache (None when not caching)."""
+    import pandas as pd
+
+    if "text_hash" not in df:
+        return _predict(df), None
+
+    miss = df["cached_label"].isna()
+    out = pd.DataFrame({
+        "posting_id": df["posting_id"].astype(str),
+        "pred_role_family": df["cached_label"].astype(object),
+        "pred_confidence": df["cached_confidence"].astype("float64"),
+    })
+    if not miss.any():
+        return out, None
+    scored = _predict(df[miss])
+    out.loc[miss, ["pred_role_family", "pred_confidence"]] = scored[["pred_role_family", "pred_confidence"]]
+    fresh = pd.DataFrame({
+        "text_hash": df.loc[miss, "text_hash"],
+        "pred_role_family": scored["pred_role_family"],
+        "pred_confidence": scored["pred_confidence"],
+    }).drop_duplicates("text_hash")
+    return out, fresh
+
+
+def iter_predictions(
+    con,
+    model_path: str,
+    table: str,
+    id_col: str,
+    title_col: str,
+    loc_col: str,
+    desc_col: str,
+    batch_size: int,
+    workers: int = 1,
+    cache_table: str | None = None,
+    feature_store: str | None = None,
+):
+    """
+    Yield prediction DataFrames batch by batch, in table order.
+
+    With workers > 1 the batches are scored in a process pool; every worker
+    loads the model once, and results come back in input order, so the output
+    is the same as a single-process run. With a cache_table only postings whose
+    text hash has no entry for this model fingerprint are scored; the rest are
+    read back from the cache. A feature_store that matches the table's text
+    (checked with one extra pass over it) replaces tokenization with lookups
+    of the stored term counts.
+    """
+    from ..parallel import bounded_map
+    from .utils import iter_postings
+
+    cols = dict(table=table, id_col=id_col, title_col=title_col, loc_col=loc_col, desc_col=desc_col)
+    if feature_store:
+        from .features import corpus_fingerprint, load_feature_store
+
+        store = load_feature_store(feature_store)
+        if store is None or store.manifest["corpus"] != corpus_fingerprint(
+            iter_postings(con, batch_size=batch_size, **cols)
+        ):
+            print(f"Feature store {feature_store} is stale or missing; vectorizing from text.")
+            feature_store = None
+
+    batches = iter_postings(con, batch_size=batch_size, **cols)
+    if cache_table:
+        fingerprint = model_fingerprint(model_path)
+        _ensure_cache(con, cache_table, fingerprint)
+        batches = _attach_cached(con, batches, cache_table, fingerprint)
+
+    for out, fresh in bounded_map(
+        _score_batch, batches, workers=workers, initializer=_init_worker, initargs=(model_path, feature_store)
+    ):
+        if fresh is not None:
+            con.register("fresh_df", fresh)
+            # OR IGNORE: a batch read ahead of this one may have scored the same text
+            con.execute(f"""
+                INSERT OR IGNORE INTO {cache_table}
+                SELECT text_hash, ?, pred_role_family, pred_confidence FROM fresh_df
+            """, [fingerprint])
+            con.unregister("fresh_df")
+        yield out
+
+
+def write_predictions(
+    con,
+    model_path: str,
+    out_table: str = "pred_role_family",
+    table: str = "stg_job_postings",
+    id_col: str = "job_id",
+    title_col: str = "title",
+    loc_col: str = "location",
+    desc_col: str = "description_full",
+    batch_size: int = 50_000,
+    workers: int = 1,
+    cache_table: str | None = "pred_role_family_cache",
+    feature_store: str | None = None,
+) -> int:
+    """Score every posting in `table` into out_table (replacing it); returns the number of rows written."""
+    from ..clean.schema import enum_sql, job_key_sql
+
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {out_table} (
+            job_key UBIGINT,
+            pred_role_family VARCHAR,
+            pred_confidence DOUBLE
+        )
+    """)
+
+    # Each batch is predicted and appended as soon as it is scored, so memory is
+    # bounded by batch_size (times the batches in flight) rather than by the table.
+    n_rows = 0
+    for out in iter_predictions(
+        con,
+        model_path=model_path,
+        table=table,
+        id_col=id_col,
+        title_col=title_col,
+        loc_col=loc_col,
+        desc_col=desc_col,
+        batch_size=batch_size,
+        workers=workers,
+        cache_table=cache_table,
+        feature_store=feature_store,
+    ):
+        # --id-col is the 16-hex job_id; predictions are keyed by its integer job_key
+        con.register("out_df", out)
+        con.execute(f"""
+            INSERT INTO {out_table}
+            SELECT {job_key_sql('posting_id')}, pred_role_family, pred_confidence FROM out_df
+        """)
+        con.unregister("out_df")
+        n_rows += len(out)
+
+    # The label set is only known once every batch is scored
+    labels = [r[0] for r in con.execute(
+        f"SELECT DISTINCT pred_role_family FROM {out_table} WHERE pred_role_family IS NOT NULL ORDER BY 1"
+    ).fetchall()]
+    if labels:
+        con.execute(f"ALTER TABLE {out_table} ALTER pred_role_family SET DATA TYPE {enum_sql(labels)}")
+    return n_rows
 
 
 def main():
+    from ..telemetry import track
+    from .utils import connect_duckdb
+
     p = argparse.ArgumentParser()
     p.add_argument("--db", required=True)
     p.add_argument("--table", default="stg_job_postings")
@@ -18,41 +311,37 @@ def main():
     p.add_argument("--loc-col", default="location")
     p.add_argument("--desc-col", default="description_full")
 
-    p.add_argument("--model", default="models/role_family_clf.joblib")
+    p.add_argument("--model", default="models/role_family_clf.joblib",
+                   help="joblib Pipeline, or a directory exported by src.ml.compact.")
     p.add_argument("--out-table", default="pred_role_family")
+    p.add_argument("--batch-size", type=int, default=50_000, help="Postings read, predicted and written per batch.")
+    p.add_argument("--workers", type=int, default=1,
+                   help="Processes scoring batches in parallel (use a --batch-size that gives each several batches).")
+    p.add_argument("--cache-table", default="pred_role_family_cache",
+                   help="Predictions keyed by text hash + model fingerprint; reruns only score misses.")
+    p.add_argument("--no-cache", action="store_true", help="Score every posting and leave the cache untouched.")
+    p.add_argument("--feature-store", default=None,
+                   help="Reuse term counts from src.ml.features (e.g. warehouse/features/role_family).")
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of this run (see src.telemetry).")
     args = p.parse_args()
 
     con = connect_duckdb(args.db)
-    df = fetch_postings(
-        con,
-        table=args.table,
-        id_col=args.id_col,
-        title_col=args.title_col,
-        loc_col=args.loc_col,
-        desc_col=args.desc_col,
-    )
-
-    model = joblib.load(args.model)
-    X = make_text(df)
-
-    pred = model.predict(X)
-    try:
-        proba = model.predict_proba(X)
-        conf = proba.max(axis=1)
-    except Exception:
-        conf = [None] * len(df)
-
-    out = pd.DataFrame({
-        "posting_id": df["posting_id"].astype(str),
-        "pred_role_family": pred.astype(str),
-        "pred_confidence": conf,
-    })
-
-    con.register("out_df", out)
-    con.execute(f"CREATE OR REPLACE TABLE {args.out_table} AS SELECT * FROM out_df")
-    con.unregister("out_df")
-
-    print(f"Wrote {len(out)} rows to {args.out_table}")
+    with track(con, "predict", profile_dir=args.profile) as run:
+        n_rows = run.rows_in = run.rows_out = write_predictions(
+            con,
+            model_path=args.model,
+            out_table=args.out_table,
+            table=args.table,
+            id_col=args.id_col,
+            title_col=args.title_col,
+            loc_col=args.loc_col,
+            desc_col=args.desc_col,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            cache_table=None if args.no_cache else args.cache_table,
+            feature_store=args.feature_store,
+        )
+    print(f"Wrote {n_rows} rows to {args.out_table}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from sklearn.linear_model import LogisticRegression, RidgeClassifier, SGDClassifier
+from sklearn.metrics import f1_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from ..parallel import bounded_map
+from .features import DEFAULT_STORE, ensure_feature_store, fit_tfidf, load_feature_store
+from .train_role_family import load_labels
+from .utils import connect_duckdb, fetch_postings, make_text
+
+# Vectorizer settings are served from the feature store, so ngram_range can
+# only narrow the stored (1, 2) range.
+VECTORIZER_GRID = [
+    {"ngram_range": ngram, "min_df": min_df, "max_df": 0.95}
+    for ngram in [(1, 1), (1, 2)]
+    for min_df in [1, 2, 5]
+]
+
+MODEL_GRID = (
+    [("logreg", {"C": c}) for c in [0.3, 1.0, 3.0]]
+    + [("linear_svc", {"C": c}) for c in [0.1, 0.3, 1.0]]
+    + [("ridge", {"alpha": a}) for a in [0.3, 1.0]]
+    + [("sgd_log", {"alpha": a}) for a in [1e-5, 1e-4]]
+)
+
+
+def make_model(name: str, params: dict, seed: int):
+    if name == "logreg":
+        return LogisticRegression(max_iter=2000, class_weight="balanced", **params)
+    if name == "linear_svc":
+        return LinearSVC(class_weight="balanced", **params)
+    if name == "ridge":
+        return RidgeClassifier(class_weight="balanced", **params)
+    if name == "sgd_log":
+        return SGDClassifier(loss="log_loss", class_weight="balanced", random_state=seed, **params)
+    raise ValueError(f"Unknown model: {name}")
+
+
+# Labeled data shared by every fit; set once per worker by _init_worker.
+_DATA = None
+
+
+def _init_worker(store_path: str, rows: np.ndarray, texts: np.ndarray, y: np.ndarray) -> None:
+    global _DATA
+    _DATA = (load_feature_store(store_path), rows, texts, y)
+
+
+def _run_fold(task: tuple) -> dict:
+    config_id, vec_params, model_name, model_params, seed, fold, train_idx, test_idx = task
+    store, rows, texts, y = _DATA
+
+    start = time.perf_counter()
+    vec, X_train = fit_tfidf(store, rows[train_idx], **vec_params)
+    clf = make_model(model_name, model_params, seed).fit(X_train, y[train_idx])
+    fit_seconds = time.perf_counter() - start
+
+    # Latency is measured end to end from raw text, as predict_role_family scores it
+    pipe = Pipeline([("tfidf", vec), ("clf", clf)])
+    start = time.perf_counter()
+    y_pred = pipe.predict(texts[test_idx])
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        "config_id": config_id,
+        "fold": fold,
+        "macro_f1": f1_score(y[test_idx], y_pred, average="macro", zero_division=0),
+        "fit_seconds": fit_seconds,
+        "predict_ms_per_1k": 1e6 * predict_seconds / len(test_idx),
+        "n_features": len(vec.vocabulary_),
+    }
+
+
+def leaderboard(results: pd.DataFrame, configs: pd.DataFrame) -> pd.DataFrame:
+    agg = results.groupby("config_id").agg(
+        macro_f1=("macro_f1", "mean"),
+        macro_f1_std=("macro_f1", "std"),
+        fit_seconds=("fit_seconds", "mean"),
+        predict_ms_per_1k=("predict_ms_per_1k", "mean"),
+        n_features=("n_features", "mean"),
+        folds=("fold", "count"),
+    )
+    board = configs.join(agg, on="config_id").sort_values(
+        ["macro_f1", "predict_ms_per_1k"], ascending=[False, True]
+    )
+    board.insert(0, "rank", range(1, len(board) + 1))
+    return board.reset_index(drop=True)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", required=True)
+    p.add_argument("--table", default="stg_job_postings")
+
+    # YOUR schema:
+    p.add_argument("--id-col", default="job_id")
+    p.add_argument("--title-col", default="title")
+    p.add_argument("--loc-col", default="location")
+    p.add_argument("--desc-col", default="description_full")
+
+    p.add_argument("--labels-csv", required=True)
+    p.add_argument("--feature-store", default=DEFAULT_STORE)
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--models", nargs="+", default=None, help="Subset of: logreg linear_svc ridge sgd_log.")
+    p.add_argument("--workers", type=int, default=1, help="Processes running (config, fold) fits.")
+    p.add_argument("--out-table", default="role_family_leaderboard")
+    p.add_argument("--max-predict-ms", type=float, default=None,
+                   help="Also report the best config scoring 1k postings within this many ms.")
+    args = p.parse_args()
+
+    labels = load_labels(args.labels_csv)
+    con = connect_duckdb(args.db)
+    df = fetch_postings(
+        con,
+        table=args.table,
+        id_col=args.id_col,
+        title_col=args.title_col,
+        loc_col=args.loc_col,
+        desc_col=args.desc_col,
+    )
+    merged = df.merge(labels[["posting_id", "role_family_label"]], on="posting_id", how="inner")
+    if merged.empty:
+        raise SystemExit("No overlap between labels posting_id and table job_id (posting_id).")
+
+    # Build/refresh the store once here; workers only memory-map it
+    store = ensure_feature_store(df, args.feature_store)
+    rows = store.rows(merged["posting_id"])
+    texts = make_text(merged).to_numpy()
+    y = merged["role_family_label"].astype(str).to_numpy()
+
+    # Folds are computed once and shared by every config, so scores are comparable
+    stratify = pd.Series(y).value_counts().min() >= args.folds
+    splitter = (StratifiedKFold if stratify else KFold)(n_splits=args.folds, shuffle=True, random_state=args.seed)
+    folds = list(splitter.split(texts, y))
+
+    model_grid = [m for m in MODEL_GRID if args.models is None or m[0] in args.models]
+    configs = pd.DataFrame([
+        {
+            "config_id": i,
+            "model": name,
+            "params": json.dumps(params, sort_keys=True),
+            "ngram_range": f"{vp['ngram_range'][0]}-{vp['ngram_range'][1]}",
+            "min_df": vp["min_df"],
+            "max_df": vp["max_df"],
+        }
+        for i, (vp, (name, params)) in enumerate(itertools.product(VECTORIZER_GRID, model_grid))
+    ])
+    tasks = [
+        (i, vp, name, params, args.seed, fold, train_idx, test_idx)
+        for i, (vp, (name, params)) in enumerate(itertools.product(VECTORIZER_GRID, model_grid))
+        for fold, (train_idx, test_idx) in enumerate(folds)
+    ]
+    print(f"Sweeping {len(configs)} configs x {len(folds)} folds on {len(merged)} labeled postings")
+
+    start = time.perf_counter()
+    results = pd.DataFrame(bounded_map(
+        _run_fold,
+        tasks,
+        workers=args.workers,
+        initializer=_init_worker,
+        initargs=(args.feature_store, rows, texts, y),
+    ))
+    board = leaderboard(results, configs)
+    elapsed = time.perf_counter() - start
+
+    con.register("board_df", board)
+    con.execute(f"CREATE OR REPLACE TABLE {args.out_table} AS SELECT * FROM board_df")
+    con.unregister("board_df")
+
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(board.drop(columns=["config_id"]).head(10).to_string(index=False, float_format="%.4f"))
+    if args.max_predict_ms is not None:
+        fast = board[board["predict_ms_per_1k"] <= args.max_predict_ms]
+        if fast.empty:
+            print(f"No config scores 1k postings within {args.max_predict_ms} ms")
+        else:
+            best = fast.iloc[0]
+            print(f"Best within {args.max_predict_ms} ms/1k: {best['model']} {best['params']} "
+                  f"ngram={best['ngram_range']} min_df={best['min_df']} macro-F1={best['macro_f1']:.4f}")
+    print(f"Done in {elapsed:.1f}s. Leaderboard: {args.out_table}")
+
+
+if __name__ == "__main__":
+    main()
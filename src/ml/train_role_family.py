@@ -7,10 +7,20 @@ import matplotlib.pyplot as plt
 
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 
+from ..telemetry import track
+from .features import (
+    ANALYZER_PARAMS,
+    DEFAULT_STORE,
+    TFIDF_PARAMS,
+    ensure_feature_store,
+    fit_tfidf,
+    store_columns,
+    transform_rows,
+)
 from .utils import connect_duckdb, fetch_postings, make_text
 
 
@@ -45,33 +55,139 @@ def save_confusion_matrix(cm, labels, out_path: str) -> None:
     plt.close(fig)
 
 
-def main():
-    p = argparse.ArgumentParser()
-    p.add_argument("--db", required=True)
-    p.add_argument("--table", default="stg_job_postings")
-
-    # YOUR schema:
-    p.add_argument("--id-col", default="job_id")
-    p.add_argument("--title-col", default="title")
-    p.add_argument("--loc-col", default="location")
-    p.add_argument("--desc-col", default="description_full")
+def write_report(args, n_labeled: int, classes: list, report_text: str) -> None:
+    with open(args.report_out, "w", encoding="utf-8") as f:
+        f.write("# Role Family Classifier Evaluation\n\n")
+        f.write(f"- Labeled rows used: {n_labeled}\n")
+        f.write(f"- Classes: {', '.join(classes)}\n")
+        f.write(f"- Split: {int((1-args.test_size)*100)}/{int(args.test_size*100)}\n")
+        if args.out_of_core:
+            f.write(f"- Model: out-of-core HashingVectorizer + SGDClassifier, {args.epochs} epoch(s)\n")
+        f.write("\n")
+        f.write("## Classification Report\n\n")
+        f.write("```text\n")
+        f.write(report_text)
+        f.write("\n```\n\n")
+        f.write("## Artifacts\n\n")
+        f.write(f"- Model: {args.model_out}\n")
+        f.write(f"- Confusion matrix: {args.cm_out}\n")
+        f.write(f"- Error examples: {args.errors_out}\n")
 
-    p.add_argument("--labels-csv", required=True)
-    p.add_argument("--model-out", default="models/role_family_clf.joblib")
-    p.add_argument("--report-out", default="reports/role_family_eval.md")
-    p.add_argument("--cm-out", default="reports/role_family_confusion.png")
-    p.add_argument("--errors-out", default="reports/role_family_errors.csv")
-    p.add_argument("--test-size", type=float, default=0.2)
-    p.add_argument("--seed", type=int, default=42)
-    args = p.parse_args()
 
-    labels = pd.read_csv(args.labels_csv)
+def load_labels(labels_csv: str) -> pd.DataFrame:
+    labels = pd.read_csv(labels_csv)
     labels["role_family_label"] = labels["role_family_label"].fillna("").astype(str).str.strip()
     labels = labels[labels["role_family_label"] != ""].copy()
     if labels.empty:
         raise SystemExit("No labeled rows found. Fill role_family_label in labels CSV first.")
+    return labels
+
 
+def _labeled_sql(args, test: bool) -> str:
+    # A stable hash of posting_id puts each posting in the same split on every run
+    return f"""
+    SELECT
+      p.{args.id_col}::VARCHAR AS posting_id,
+      p.{args.title_col} AS title,
+      p.{args.loc_col} AS location,
+      p.{args.desc_col} AS description,
+      l.role_family_label
+    FROM {args.table} p
+    JOIN role_family_labels l ON l.posting_id = p.{args.id_col}::VARCHAR
+    WHERE (md5_number(l.posting_id || ':' || {int(args.seed)}) % 1000 < {int(args.test_size * 1000)}) = {test}
+    """
+
+
+def _stream_labeled(con, args, test: bool, order: str):
+    """Labeled postings of one split, as DataFrames of at most --batch-size rows."""
+    result = con.execute(_labeled_sql(args, test) + f" ORDER BY {order}")
+    # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+    to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+    for batch in to_reader(args.batch_size):
+        df = batch.to_pandas()
+        for c in ["title", "location", "description"]:
+            df[c] = df[c].fillna("").astype(str)
+        yield df
+
+
+def train_out_of_core(args, labels: pd.DataFrame) -> int:
+    """
+    Train HashingVectorizer + SGDClassifier with partial_fit over streamed batches.
+
+    Hashing features need no fitted vocabulary, so memory is bounded by
+    --batch-size whatever the number of labeled postings; the saved Pipeline
+    takes raw text like the default model.
+    """
     con = connect_duckdb(args.db)
+    con.register("labels_df", labels[["posting_id", "role_family_label"]])
+    con.execute("CREATE OR REPLACE TEMP TABLE role_family_labels AS SELECT posting_id::VARCHAR AS posting_id, role_family_label FROM labels_df")
+    con.unregister("labels_df")
+
+    # partial_fit needs every class up front, and "balanced" weights from the train split
+    counts = dict(con.execute(f"""
+        SELECT role_family_label, COUNT(*)
+        FROM ({_labeled_sql(args, test=False)})
+        GROUP BY 1
+    """).fetchall())
+    if not counts:
+        raise SystemExit("No overlap between labels posting_id and table job_id (posting_id).")
+    classes = sorted(counts)
+    n_train = sum(counts.values())
+    class_weight = {c: n_train / (len(classes) * n) for c, n in counts.items()}
+
+    vec = HashingVectorizer(
+        **ANALYZER_PARAMS,
+        n_features=args.n_features,
+        alternate_sign=False,
+        norm="l2",
+    )
+    clf = SGDClassifier(
+        loss="log_loss",
+        alpha=args.alpha,
+        class_weight=class_weight,
+        random_state=args.seed,
+    )
+    for epoch in range(args.epochs):
+        # Reshuffle every epoch; SGD converges poorly on label-sorted batches
+        order = f"md5_number(l.posting_id || ':{int(args.seed)}:{epoch}')"
+        for batch in _stream_labeled(con, args, test=False, order=order):
+            y = batch["role_family_label"].astype(str).to_numpy()
+            clf.partial_fit(vec.transform(make_text(batch)), y, classes=classes)
+        print(f"epoch {epoch + 1}/{args.epochs} done")
+
+    pipe = Pipeline([("hashing", vec), ("clf", clf)])
+    joblib.dump(pipe, args.model_out)
+
+    y_test, y_pred, errors = [], [], []
+    for batch in _stream_labeled(con, args, test=True, order="l.posting_id"):
+        proba = clf.predict_proba(vec.transform(make_text(batch)))
+        batch["pred_label"] = clf.classes_[proba.argmax(axis=1)]
+        batch["pred_confidence"] = proba.max(axis=1)
+        y_test.extend(batch["role_family_label"].astype(str))
+        y_pred.extend(batch["pred_label"])
+        errors.append(batch[batch["pred_label"] != batch["role_family_label"]])
+    con.close()
+
+    cm = confusion_matrix(y_test, y_pred, labels=classes)
+    save_confusion_matrix(cm, classes, args.cm_out)
+    report_text = classification_report(y_test, y_pred, zero_division=0)
+
+    errors = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=["pred_confidence"])
+    errors = errors.sort_values("pred_confidence", ascending=False)
+    errors.reindex(columns=["posting_id", "title", "location", "role_family_label", "pred_label", "pred_confidence", "description"]).to_csv(
+        args.errors_out, index=False
+    )
+
+    write_report(args, n_train + len(y_test), classes, report_text)
+
+    print("Done.")
+    print("Model:", args.model_out)
+    print("Report:", args.report_out)
+    return n_train + len(y_test)
+
+
+def train_in_memory(args, labels: pd.DataFrame, con) -> int:
+    """Fit TF-IDF + LogisticRegression on the labeled postings held in memory; returns how many were used."""
     df = fetch_postings(
         con,
         table=args.table,
@@ -95,21 +211,29 @@ def main():
         stratify=y if y.nunique() > 1 else None,
     )
 
-    pipe = Pipeline([
-        ("tfidf", TfidfVectorizer(
-            stop_words="english",
-            ngram_range=(1, 2),
-            min_df=2,
-            max_df=0.95,
-        )),
-        ("clf", LogisticRegression(
-            max_iter=2000,
-            class_weight="balanced",
-        )),
-    ])
-
-    pipe.fit(X_train, y_train)
-    y_pred = pipe.predict(X_test)
+    clf = LogisticRegression(
+        max_iter=2000,
+        class_weight="balanced",
+    )
+
+    if args.no_feature_store:
+        pipe = Pipeline([
+            ("tfidf", TfidfVectorizer(**ANALYZER_PARAMS, **TFIDF_PARAMS)),
+            ("clf", clf),
+        ])
+        pipe.fit(X_train, y_train)
+        model, X_eval = pipe, X_test
+    else:
+        # Tokenization happens once per corpus version; each run only prunes
+        # and weights the stored counts of its training split.
+        store = ensure_feature_store(df, args.feature_store)
+        vec, X_train_tfidf = fit_tfidf(store, store.rows(merged.loc[X_train.index, "posting_id"]))
+        clf.fit(X_train_tfidf, y_train)
+        pipe = Pipeline([("tfidf", vec), ("clf", clf)])
+        test_rows = store.rows(merged.loc[X_test.index, "posting_id"])
+        model, X_eval = clf, transform_rows(store, vec, test_rows, store_columns(store, vec))
+
+    y_pred = model.predict(X_eval)
 
     classes = sorted(y.unique().tolist())
     cm = confusion_matrix(y_test, y_pred, labels=classes)
@@ -127,7 +251,7 @@ def main():
 
     # add confidence if possible
     try:
-        proba = pipe.predict_proba(X_test)
+        proba = model.predict_proba(X_eval)
         test_df["pred_confidence"] = proba.max(axis=1)
     except Exception:
         test_df["pred_confidence"] = None
@@ -137,24 +261,53 @@ def main():
         args.errors_out, index=False
     )
 
-    # Write markdown report
-    with open(args.report_out, "w", encoding="utf-8") as f:
-        f.write("# Role Family Classifier Evaluation\n\n")
-        f.write(f"- Labeled rows used: {len(merged)}\n")
-        f.write(f"- Classes: {', '.join(classes)}\n")
-        f.write(f"- Split: {int((1-args.test_size)*100)}/{int(args.test_size*100)}\n\n")
-        f.write("## Classification Report\n\n")
-        f.write("```text\n")
-        f.write(report_text)
-        f.write("\n```\n\n")
-        f.write("## Artifacts\n\n")
-        f.write(f"- Model: {args.model_out}\n")
-        f.write(f"- Confusion matrix: {args.cm_out}\n")
-        f.write(f"- Error examples: {args.errors_out}\n")
+    write_report(args, len(merged), classes, report_text)
 
     print("Done.")
     print("Model:", args.model_out)
     print("Report:", args.report_out)
+    return len(merged)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--db", required=True)
+    p.add_argument("--table", default="stg_job_postings")
+
+    # YOUR schema:
+    p.add_argument("--id-col", default="job_id")
+    p.add_argument("--title-col", default="title")
+    p.add_argument("--loc-col", default="location")
+    p.add_argument("--desc-col", default="description_full")
+
+    p.add_argument("--labels-csv", required=True)
+    p.add_argument("--model-out", default="models/role_family_clf.joblib")
+    p.add_argument("--report-out", default="reports/role_family_eval.md")
+    p.add_argument("--cm-out", default="reports/role_family_confusion.png")
+    p.add_argument("--errors-out", default="reports/role_family_errors.csv")
+    p.add_argument("--test-size", type=float, default=0.2)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--feature-store", default=DEFAULT_STORE,
+                   help="Stored term counts reused across runs; rebuilt when postings text changes.")
+    p.add_argument("--no-feature-store", action="store_true", help="Refit TF-IDF from raw text instead.")
+
+    # Out-of-core mode (for label sets too large to hold in memory):
+    p.add_argument("--out-of-core", action="store_true",
+                   help="Stream labeled postings from DuckDB into HashingVectorizer + SGDClassifier.partial_fit.")
+    p.add_argument("--batch-size", type=int, default=10_000)
+    p.add_argument("--epochs", type=int, default=5)
+    p.add_argument("--n-features", type=int, default=2**20)
+    p.add_argument("--alpha", type=float, default=1e-5)
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of this run (see src.telemetry).")
+    args = p.parse_args()
+
+    labels = load_labels(args.labels_csv)
+    con = connect_duckdb(args.db)
+    with track(con, "train", profile_dir=args.profile) as run:
+        if args.out_of_core:
+            run.rows_in = train_out_of_core(args, labels)
+        else:
+            run.rows_in = train_in_memory(args, labels, con)
 
 
 if __name__ == "__main__":
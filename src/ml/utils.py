@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Iterator
+
 import duckdb
 import pandas as pd
 
@@ -17,7 +19,37 @@ def fetch_postings(
     desc_col: str,
     limit: int | None = None,
 ) -> pd.DataFrame:
-    sql = f"""
+    sql = _postings_sql(table, id_col, title_col, loc_col, desc_col)
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+
+    return _clean_postings(con.execute(sql).df())
+
+
+def iter_postings(
+    con: duckdb.DuckDBPyConnection,
+    table: str,
+    id_col: str,
+    title_col: str,
+    loc_col: str,
+    desc_col: str,
+    batch_size: int,
+) -> Iterator[pd.DataFrame]:
+    """Like fetch_postings, but yields DataFrames of at most batch_size rows."""
+    # Read on a separate cursor so the caller can keep writing through `con`
+    cur = con.cursor()
+    try:
+        result = cur.execute(_postings_sql(table, id_col, title_col, loc_col, desc_col))
+        # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+        to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        for batch in to_reader(batch_size):
+            yield _clean_postings(batch.to_pandas())
+    finally:
+        cur.close()
+
+
+def _postings_sql(table: str, id_col: str, title_col: str, loc_col: str, desc_col: str) -> str:
+    return f"""
     SELECT
       {id_col} AS posting_id,
       {title_col} AS title,
@@ -25,10 +57,9 @@ def fetch_postings(
       {desc_col} AS description
     FROM {table}
     """
-    if limit is not None:
-        sql += f" LIMIT {int(limit)}"
 
-    df = con.execute(sql).df()
+
+def _clean_postings(df: pd.DataFrame) -> pd.DataFrame:
     for c in ["title", "location", "description"]:
         df[c] = df[c].fillna("").astype(str)
     df["posting_id"] = df["posting_id"].astype(str)
@@ -1,15 +1,26 @@
+import argparse
+import hashlib
+import math
 import pathlib
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Set, Tuple
 
 import duckdb
 import pandas as pd
 import yaml
 
+from src.clean.schema import JOB_SKILLS_COLUMNS, create_views, ensure_dims, job_key_sql, table_columns
+from src.parallel import bounded_map
+from src.telemetry import track
+
 REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
 DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
 SKILLS_PATH = REPO_ROOT / "src" / "nlp" / "skills.yml"
 
+# Same boundary rules compile_patterns applies to each skill on its own.
+BOUNDARY_BEFORE = r"(?<![a-z0-9])"
+BOUNDARY_AFTER = r"(?![a-z0-9])"
+
 def load_skills() -> Dict[str, List[str]]:
     with open(SKILLS_PATH, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
@@ -25,39 +36,277 @@ def compile_patterns(skills: Dict[str, List[str]]) -> Dict[str, List[Tuple[str,
             # - escape regex characters
             escaped = re.escape(s)
             # match as a standalone token sequence
-            pat = re.compile(r"(?<![a-z0-9])" + escaped + r"(?![a-z0-9])", re.IGNORECASE)
+            pat = re.compile(BOUNDARY_BEFORE + escaped + BOUNDARY_AFTER, re.IGNORECASE)
             compiled[category].append((s, pat))
     return compiled
 
-def main() -> None:
-    skills = load_skills()
-    patterns = compile_patterns(skills)
+def _trie_regex(node: dict) -> str:
+    # Render a character trie as a regex so every skill shares its prefix with
+    # its siblings; "" marks the end of a skill. Optional groups are greedy, so
+    # the longest skill that satisfies the trailing boundary wins.
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        return "(?:" + body + ")?"
+    return body
 
-    con = duckdb.connect(str(DB_PATH))
-    jobs = con.execute("SELECT job_id, title, description_full FROM stg_job_postings").df()
-    con.close()
+class SkillMatcher:
+    """
+    Finds every taxonomy term in one pass over the text.
+
+    All skills are compiled into a single trie-shaped regex, so scanning cost
+    follows text length instead of taxonomy size. The regex only reports the
+    longest skill starting at each position; shorter skills that are prefixes
+    of it (e.g. "spark" inside "spark streaming") are resolved ahead of time,
+    which keeps results identical to running compile_patterns one by one.
+    """
+
+    def __init__(self, skills: Dict[str, List[str]]):
+        categories: Dict[str, List[str]] = {}
+        for category, items in skills.items():
+            for skill in items:
+                s = skill.lower().strip()
+                if category not in categories.setdefault(s, []):
+                    categories[s].append(category)
+
+        trie: dict = {}
+        for s in categories:
+            node = trie
+            for ch in s:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+        boundary = re.compile(r"[a-z0-9]", re.IGNORECASE)
+        self._hits: Dict[str, Set[Tuple[str, str]]] = {}
+        for s in categories:
+            hits = set()
+            for other, cats in categories.items():
+                if s.startswith(other) and (len(other) == len(s) or not boundary.match(s[len(other)])):
+                    hits.update((other, c) for c in cats)
+            self._hits.setdefault(s.casefold(), set()).update(hits)
+
+        self.pattern = re.compile(
+            BOUNDARY_BEFORE + "(?=(" + _trie_regex(trie) + ")" + BOUNDARY_AFTER + ")",
+            re.IGNORECASE,
+        )
+
+    def match(self, text: str) -> Set[Tuple[str, str]]:
+        """Return the (skill, category) pairs found in already-lowercased text."""
+        found: Set[Tuple[str, str]] = set()
+        for m in self.pattern.finditer(text):
+            found.update(self._hits.get(m.group(1).casefold(), ()))
+        return found
+
+# Matcher used by _extract_shard; built once per worker by _init_worker.
+_MATCHER: SkillMatcher | None = None
+
+def _init_worker(skills: Dict[str, List[str]]) -> None:
+    global _MATCHER
+    _MATCHER = SkillMatcher(skills)
 
+def _extract_shard(jobs: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str]]:
     rows = []
-    for _, r in jobs.iterrows():
-        text = f"{r['title']} {r['description_full']}".lower()
-        job_id = r["job_id"]
+    for job_id, title, description in jobs:
+        text = f"{title} {description}".lower()
+        rows.extend((job_id, skill, category) for skill, category in _MATCHER.match(text))
+    return rows
 
-        found = set()
-        for category, pats in patterns.items():
-            for skill, pat in pats:
-                if pat.search(text):
-                    found.add((job_id, skill, category))
+def iter_shards(
+    con: duckdb.DuckDBPyConnection,
+    shard_size: int,
+    where: str = "TRUE",
+    table: str = "stg_job_postings",
+    min_shards: int = 1,
+) -> Iterator[List[Tuple[str, str, str]]]:
+    """
+    The postings selected by `where` in job_id order, cut into contiguous
+    job_id ranges of at most shard_size postings (at least min_shards of them).
 
-        rows.extend(list(found))
+    The selection is numbered in job_id order into a temp table once, and
+    each shard reads its shard_row range from just that range's row groups;
+    filtering `table` on a job_id range per shard would rescan all of it for
+    every shard. (rowid won't do: rows written inside a transaction get
+    rowids far past 0.) Unlike streaming one result set, this lets the caller
+    keep writing through `con` between shards.
+    """
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE shard_rows AS
+        SELECT row_number() OVER (ORDER BY job_id) - 1 AS shard_row, job_id, title, description_full
+        FROM {table} WHERE {where}
+        ORDER BY shard_row
+    """)
+    total = con.execute("SELECT COUNT(*) FROM shard_rows").fetchone()[0]
+    size = max(min(shard_size, math.ceil(total / min_shards)), 1)
+    for lo in range(0, total, size):
+        yield con.execute(
+            "SELECT job_id, title, description_full FROM shard_rows WHERE shard_row >= ? AND shard_row < ? ORDER BY shard_row",
+            [lo, lo + size],
+        ).fetchall()
+    con.execute("DROP TABLE shard_rows")
 
-    out = pd.DataFrame(rows, columns=["job_id", "skill", "category"])
+def skill_fingerprints(skills: Dict[str, List[str]]) -> pd.DataFrame:
+    # A skill's fingerprint covers its compiled pattern, so changing the
+    # boundary rules or escaping invalidates it just like editing the YAML.
+    rows = {}
+    for category, pats in compile_patterns(skills).items():
+        for skill, pat in pats:
+            key = f"{category}|{pat.pattern}|{pat.flags}"
+            rows[(skill, category)] = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return pd.DataFrame(
+        [(skill, category, fp) for (skill, category), fp in rows.items()],
+        columns=["skill", "category", "fingerprint"],
+    )
+
+def _table_exists(con: duckdb.DuckDBPyConnection, name: str) -> bool:
+    sql = "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?"
+    return con.execute(sql, [name]).fetchone()[0] > 0
+
+def _scan(
+    con: duckdb.DuckDBPyConnection,
+    skills: Dict[str, List[str]],
+    where: str,
+    workers: int,
+    shard_size: int,
+    table: str = "stg_job_postings",
+) -> int:
+    """Match `skills` against the postings selected by `where` and append the hits to job_skills."""
+    if not any(skills.values()):
+        return 0
+
+    # Each shard's rows are appended as soon as its worker finishes, so only a
+    # few shards are ever held in memory at once.
+    n_rows = 0
+    for rows in bounded_map(
+        _extract_shard,
+        iter_shards(con, shard_size, where, table, min_shards=max(workers, 1)),
+        workers=workers,
+        initializer=_init_worker,
+        initargs=(skills,),
+    ):
+        if not rows:
+            continue
+        shard_df = pd.DataFrame(rows, columns=["job_id", "skill", "category"])
+        con.execute(f"""
+            INSERT INTO job_skills
+            SELECT {job_key_sql('d.job_id')}, sd.skill_id, cd.category_id
+            FROM shard_df d
+            JOIN skill_dim sd ON sd.skill = d.skill
+            JOIN category_dim cd ON cd.category = d.category
+        """)
+        n_rows += len(rows)
+    return n_rows
+
+def extract_skills(
+    con: duckdb.DuckDBPyConnection,
+    workers: int = 1,
+    shard_size: int = 50_000,
+    full_refresh: bool = False,
+    table: str = "stg_job_postings",
+) -> int:
+    """Bring job_skills up to date with `table` and skills.yml; returns its row count."""
+    skills = load_skills()
+    fingerprints = skill_fingerprints(skills)
+
+    con.execute("BEGIN TRANSACTION")
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE posting_hashes AS
+        SELECT job_key, md5(coalesce(title, '') || ' ' || coalesce(description_full, '')) AS content_hash
+        FROM {table}
+    """)
+    ensure_dims(con, fingerprints)
+
+    incremental = not full_refresh and all(
+        _table_exists(con, t) for t in ["job_skills", "job_skills_posting_state", "job_skills_skill_state"]
+    ) and "job_key" in table_columns(con, "job_skills_posting_state")
+    if not incremental:
+        con.execute(f"CREATE OR REPLACE TABLE job_skills ({JOB_SKILLS_COLUMNS})")
+        n_new = _scan(con, skills, "TRUE", workers, shard_size, table)
+        print(f"Full scan: {n_new:,} job_skills rows")
+    else:
+        # Postings that are new or whose text changed get a full rescan;
+        # postings that disappeared from staging just lose their rows.
+        con.execute("""
+            CREATE OR REPLACE TEMP TABLE changed_postings AS
+            SELECT h.job_key
+            FROM posting_hashes h
+            LEFT JOIN job_skills_posting_state s ON s.job_key = h.job_key
+            WHERE s.content_hash IS DISTINCT FROM h.content_hash
+        """)
+        n_changed = con.execute("SELECT COUNT(*) FROM changed_postings").fetchone()[0]
+        n_removed = con.execute("""
+            DELETE FROM job_skills
+            WHERE job_key IN (SELECT job_key FROM changed_postings)
+               OR job_key NOT IN (SELECT job_key FROM posting_hashes)
+        """).fetchone()[0]
+
+        # Skills that are new or whose pattern changed are rescanned across
+        # the unchanged postings; removed or edited skills lose their old rows.
+        stale_skills = con.execute("""
+            SELECT s.skill, s.category
+            FROM job_skills_skill_state s
+            LEFT JOIN fingerprints f ON f.skill = s.skill AND f.category = s.category
+            WHERE f.fingerprint IS DISTINCT FROM s.fingerprint
+        """).fetchall()
+        new_skills = con.execute("""
+            SELECT f.skill, f.category
+            FROM fingerprints f
+            LEFT JOIN job_skills_skill_state s ON s.skill = f.skill AND s.category = f.category
+            WHERE s.fingerprint IS DISTINCT FROM f.fingerprint
+        """).fetchall()
+        if stale_skills:
+            stale_df = pd.DataFrame(stale_skills, columns=["skill", "category"])
+            n_removed += con.execute("""
+                DELETE FROM job_skills USING stale_df
+                JOIN skill_dim sd ON sd.skill = stale_df.skill
+                JOIN category_dim cd ON cd.category = stale_df.category
+                WHERE job_skills.skill_id = sd.skill_id AND job_skills.category_id = cd.category_id
+            """).fetchone()[0]
+
+        n_new = _scan(
+            con, skills, "job_key IN (SELECT job_key FROM changed_postings)",
+            workers, shard_size, table,
+        )
+        skill_subset: Dict[str, List[str]] = {}
+        for skill, category in new_skills:
+            skill_subset.setdefault(category, []).append(skill)
+        n_new += _scan(
+            con, skill_subset, "job_key NOT IN (SELECT job_key FROM changed_postings)",
+            workers, shard_size, table,
+        )
+
+        print(
+            f"Incremental: {n_changed:,} new/changed postings, {len(new_skills)} new/edited skills, "
+            f"{len(stale_skills)} removed/edited skills | -{n_removed:,} +{n_new:,} job_skills rows"
+        )
+
+    con.execute("CREATE OR REPLACE TABLE job_skills_posting_state AS SELECT * FROM posting_hashes")
+    con.execute("CREATE OR REPLACE TABLE job_skills_skill_state AS SELECT * FROM fingerprints")
+    create_views(con)
+    con.execute("COMMIT")
+
+    return con.execute("SELECT COUNT(*) FROM job_skills").fetchone()[0]
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--workers", type=int, default=1, help="Processes used for matching (1 = in-process).")
+    p.add_argument("--shard-size", type=int, default=50_000, help="Target postings per job_id-range shard.")
+    p.add_argument("--full-refresh", action="store_true", help="Ignore saved state and rescan every posting.")
+    p.add_argument("--table", default="stg_job_postings",
+                   help="Postings to scan, e.g. stg_job_postings_canonical for one posting per near-duplicate cluster.")
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of this run (see src.telemetry).")
+    args = p.parse_args()
 
     con = duckdb.connect(str(DB_PATH))
-    con.execute("CREATE OR REPLACE TABLE job_skills AS SELECT * FROM out")
+    n_postings = con.execute(f"SELECT COUNT(*) FROM {args.table}").fetchone()[0]
+    with track(con, "extract_skills", rows_in=n_postings, profile_dir=args.profile) as run:
+        n_rows = run.rows_out = extract_skills(con, args.workers, args.shard_size, args.full_refresh, args.table)
+    head = con.execute("SELECT * FROM job_skills_named LIMIT 15").df()
     con.close()
 
-    print(f"job_skills rows: {len(out):,}")
-    print(out.head(15).to_string(index=False))
+    print(f"job_skills rows: {n_rows:,}")
+    print(head.to_string(index=False))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,305 @@
+import argparse
+import pathlib
+import re
+import time
+from typing import List, Tuple
+
+import duckdb
+import pandas as pd
+
+from src.telemetry import track
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+
+# Lowercased tokens are runs of letters, digits, '+' and '#' (so c++, c# and
+# 3+ survive); everything else separates tokens. Indexing and queries both
+# tokenize in DuckDB with this pattern, so they always agree.
+SPLIT_PATTERN = "[^a-z0-9+#]+"
+STOPWORDS = [
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it",
+    "its", "of", "on", "or", "our", "that", "the", "their", "this", "to", "we", "will", "with", "you", "your",
+]
+# A title token counts as this many description tokens
+TITLE_WEIGHT = 3
+# BM25 parameters (the usual defaults)
+K1, B = 1.2, 0.75
+# Every indexing batch appends one run sorted by term_id; a query reads about
+# one row group per run per term, so past this many runs they are merged
+MAX_RUNS = 32
+
+RESULT_COLUMNS = ["job_key", "title", "company", "location", "posted_date", "role_family", "score", "job_link"]
+
+def _stopwords_sql() -> str:
+    return "(" + ", ".join(f"'{w}'" for w in STOPWORDS) + ")"
+
+def _ensure_tables(con: duckdb.DuckDBPyConnection) -> None:
+    # search_terms ids are append-only, like skill_dim; search_postings is made
+    # of runs sorted by term_id, so DuckDB's row-group min/max skip everything
+    # but the query terms' stretch of each run
+    con.execute("CREATE TABLE IF NOT EXISTS search_terms (term_id UINTEGER PRIMARY KEY, term VARCHAR NOT NULL UNIQUE)")
+    con.execute("CREATE TABLE IF NOT EXISTS search_docs (job_key UBIGINT, content_hash UBIGINT, doc_len UINTEGER)")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS search_postings (term_id UINTEGER, job_key UBIGINT, tf USMALLINT, doc_len UINTEGER)
+    """)
+    con.execute("CREATE TABLE IF NOT EXISTS search_index_state (runs INTEGER)")
+    if con.execute("SELECT COUNT(*) FROM search_index_state").fetchone()[0] == 0:
+        con.execute("INSERT INTO search_index_state VALUES (0)")
+
+def _index_batch(con: duckdb.DuckDBPyConnection, lo: int, hi: int, table: str) -> int:
+    """Tokenize postings lo..hi of search_todo into search_postings / search_docs; returns postings added."""
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE search_tf AS
+        WITH todo AS (
+            SELECT job_key, content_hash FROM search_todo WHERE rn BETWEEN {lo} AND {hi}
+        ), tokens AS (
+            SELECT s.job_key, unnest(regexp_split_to_array(lower(coalesce(s.title, '')), '{SPLIT_PATTERN}')) AS term,
+                   {TITLE_WEIGHT} AS weight
+            FROM {table} s SEMI JOIN todo USING (job_key)
+            UNION ALL
+            SELECT s.job_key, unnest(regexp_split_to_array(lower(coalesce(s.description_full, '')), '{SPLIT_PATTERN}')),
+                   1
+            FROM {table} s SEMI JOIN todo USING (job_key)
+        )
+        SELECT job_key, term, sum(weight) AS tf
+        FROM tokens
+        WHERE term <> '' AND term NOT IN {_stopwords_sql()}
+        GROUP BY ALL
+    """)
+    con.execute("CREATE OR REPLACE TEMP TABLE search_len AS SELECT job_key, sum(tf) AS doc_len FROM search_tf GROUP BY 1")
+    con.execute("""
+        INSERT INTO search_terms
+        SELECT (SELECT coalesce(max(term_id), 0) FROM search_terms) + row_number() OVER (ORDER BY term), term
+        FROM (SELECT DISTINCT term FROM search_tf) ANTI JOIN search_terms USING (term)
+    """)
+    con.execute(f"""
+        INSERT INTO search_docs
+        SELECT t.job_key, t.content_hash, coalesce(l.doc_len, 0)
+        FROM search_todo t
+        LEFT JOIN search_len l USING (job_key)
+        WHERE t.rn BETWEEN {lo} AND {hi}
+    """)
+    return con.execute("""
+        INSERT INTO search_postings
+        SELECT st.term_id, f.job_key, least(f.tf, 65535), d.doc_len
+        FROM search_tf f
+        JOIN search_terms st USING (term)
+        JOIN search_len d USING (job_key)
+        ORDER BY st.term_id, f.job_key
+    """).fetchone()[0]
+
+def compact(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("CREATE OR REPLACE TABLE search_postings AS SELECT * FROM search_postings ORDER BY term_id, job_key")
+    con.execute("UPDATE search_index_state SET runs = 1")
+
+def build_index(
+    con: duckdb.DuckDBPyConnection,
+    table: str = "stg_job_postings",
+    full_refresh: bool = False,
+    batch_size: int = 50_000,
+) -> int:
+    """
+    Bring the search index up to date with `table`; returns postings (re)indexed.
+
+    Only postings that are new, or whose title / description_full changed
+    (by content hash), are tokenized; changed and deleted postings are
+    removed from the index first. Each batch is committed on its own, so a
+    run that is interrupted picks up where it stopped, and is appended as one
+    run sorted by term_id; search_postings is re-sorted in one pass once it
+    holds more than MAX_RUNS runs.
+    """
+    _ensure_tables(con)
+    con.execute("BEGIN TRANSACTION")
+    if full_refresh:
+        for t in ["search_postings", "search_docs"]:
+            con.execute(f"DELETE FROM {t}")
+        con.execute("UPDATE search_index_state SET runs = 0")
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE search_todo AS
+        SELECT s.job_key, hash(s.title, s.description_full) AS content_hash,
+               row_number() OVER (ORDER BY s.job_key) AS rn
+        FROM {table} s
+        LEFT JOIN search_docs d USING (job_key)
+        WHERE d.job_key IS NULL OR d.content_hash <> hash(s.title, s.description_full)
+    """)
+    # Changed postings are in search_todo too; deleted ones are no longer in the table
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE search_stale AS
+        SELECT job_key FROM search_docs SEMI JOIN search_todo USING (job_key)
+        UNION ALL
+        SELECT job_key FROM search_docs ANTI JOIN {table} USING (job_key)
+    """)
+    n_todo = con.execute("SELECT COUNT(*) FROM search_todo").fetchone()[0]
+    n_stale = con.execute("SELECT COUNT(*) FROM search_stale").fetchone()[0]
+    if n_stale:
+        con.execute("DELETE FROM search_postings WHERE job_key IN (SELECT job_key FROM search_stale)")
+        con.execute("DELETE FROM search_docs WHERE job_key IN (SELECT job_key FROM search_stale)")
+    con.execute("COMMIT")
+
+    added = 0
+    for lo in range(1, n_todo + 1, batch_size):
+        con.execute("BEGIN TRANSACTION")
+        added += _index_batch(con, lo, lo + batch_size - 1, table)
+        con.execute("UPDATE search_index_state SET runs = runs + 1")
+        con.execute("COMMIT")
+
+    if con.execute("SELECT runs FROM search_index_state").fetchone()[0] > MAX_RUNS:
+        con.execute("BEGIN TRANSACTION")
+        compact(con)
+        con.execute("COMMIT")
+    for t in ["search_todo", "search_stale", "search_tf", "search_len"]:
+        con.execute(f"DROP TABLE IF EXISTS {t}")
+    total = con.execute("SELECT COUNT(*) FROM search_postings").fetchone()[0]
+    print(f"Search index: {n_todo:,} postings (re)indexed ({added:,} term postings), {n_stale:,} removed, "
+          f"{total:,} term postings in total")
+    return n_todo
+
+def tokenize(con: duckdb.DuckDBPyConnection, text: str) -> List[str]:
+    """The distinct index terms in `text`, in order of first appearance."""
+    tokens = con.execute(
+        f"SELECT regexp_split_to_array(lower(?), '{SPLIT_PATTERN}')", [text]
+    ).fetchone()[0]
+    return list(dict.fromkeys(t for t in tokens if t and t not in STOPWORDS))
+
+def parse_query(text: str) -> Tuple[str, List[str]]:
+    """Split a query into free text and its "quoted phrases"."""
+    phrases = [p.strip() for p in re.findall(r'"([^"]+)"', text) if p.strip()]
+    return re.sub(r'"[^"]*"', " ", text), phrases
+
+def rank(
+    con: duckdb.DuckDBPyConnection,
+    terms: List[str],
+    required: List[str] | None = None,
+    where: str = "TRUE",
+    params: list | None = None,
+    limit: int | None = None,
+) -> pd.DataFrame:
+    """
+    (job_key, score) of postings matching any of `terms` and all of `required`, best first.
+
+    BM25 over title (weighted TITLE_WEIGHT) and description_full. `where` /
+    `params` filter on stg_job_postings columns; without one the top `limit`
+    are kept before stg_job_postings is touched, so a common term never
+    joins millions of rows.
+    """
+    filtered = where != "TRUE"
+    top = "" if filtered or limit is None else f"ORDER BY score DESC, job_key LIMIT {int(limit)}"
+    filter_join = f"SEMI JOIN stg_job_postings s ON s.job_key = sc.job_key AND ({where})" if filtered else ""
+    return con.execute(f"""
+        WITH q AS (
+            SELECT st.term_id, list_contains(?, st.term) AS required
+            FROM search_terms st WHERE list_contains(?, st.term)
+        ), n AS (
+            SELECT COUNT(*) AS n_docs, avg(doc_len) AS avgdl FROM search_docs
+        ), hits AS (
+            SELECT p.job_key, p.term_id, p.tf, p.doc_len FROM search_postings p SEMI JOIN q USING (term_id)
+        ), idf AS (
+            SELECT term_id, q.required, ln(1 + (n_docs - df + 0.5) / (df + 0.5)) AS idf
+            FROM (SELECT term_id, COUNT(*) AS df FROM hits GROUP BY 1) JOIN q USING (term_id), n
+        ), scored AS (
+            SELECT h.job_key,
+                   sum(idf * tf * ({K1} + 1) / (tf + {K1} * (1 - {B} + {B} * doc_len / avgdl))) AS score
+            FROM hits h JOIN idf USING (term_id), n
+            GROUP BY h.job_key
+            HAVING count(*) FILTER (WHERE required) = ?
+            {top}
+        )
+        SELECT sc.job_key, sc.score
+        FROM scored sc {filter_join}
+        ORDER BY sc.score DESC, sc.job_key
+        {"" if limit is None else f"LIMIT {int(limit)}"}
+    """, [required or [], terms, len(required or [])] + list(params or [])).df()
+
+def _with_phrases(con: duckdb.DuckDBPyConnection, ranked: pd.DataFrame, phrases: List[str], limit: int) -> pd.DataFrame:
+    """The first `limit` rows of `ranked` whose title + description contain every phrase."""
+    checks = " AND ".join("strpos(text, ?) > 0" for _ in phrases)
+    # Whitespace is collapsed on both sides, so a phrase typed with single
+    # spaces matches words split by a newline or a run of spaces
+    phrases = [" ".join(phrase.lower().split()) for phrase in phrases]
+    kept, pos, chunk = [], 0, max(limit * 10, 200)
+    # Walk the ranking in growing chunks; OFFSET 0 stops DuckDB pushing the
+    # substring checks into the stg_job_postings scan, where they would run
+    # on every description rather than on this chunk's
+    while pos < len(ranked) and sum(len(k) for k in kept) < limit:
+        candidates = ranked.iloc[pos:pos + chunk]
+        kept.append(con.execute(f"""
+            SELECT c.job_key, c.score
+            FROM candidates c
+            JOIN (
+                SELECT s.job_key,
+                       regexp_replace(lower(s.title || ' ' || coalesce(s.description_full, '')), '\\s+', ' ', 'g') AS text
+                FROM candidates c JOIN stg_job_postings s USING (job_key)
+                OFFSET 0
+            ) m USING (job_key)
+            WHERE {checks}
+        """, phrases).df())
+        pos, chunk = pos + chunk, chunk * 4
+    if not kept:
+        return ranked.iloc[0:0]
+    return pd.concat(kept).sort_values(["score", "job_key"], ascending=[False, True]).head(limit)
+
+def search(
+    con: duckdb.DuckDBPyConnection,
+    text: str,
+    limit: int = 20,
+    where: str = "TRUE",
+    params: list | None = None,
+    match_all: bool = False,
+) -> pd.DataFrame:
+    """
+    Postings ranked by BM25 for a keyword query, best first.
+
+    Any query term can match unless match_all; words in "double quotes" must
+    all appear, and appear as that exact phrase. `where` / `params` filter on
+    stg_job_postings columns (e.g. the dashboard's role / location / date
+    filter).
+    """
+    free_text, phrases = parse_query(text)
+    phrase_terms = [t for p in phrases for t in tokenize(con, p)]
+    terms = list(dict.fromkeys(tokenize(con, free_text) + phrase_terms))
+    if not terms:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    # Postings must match every term when match_all, and every phrase term anyway
+    required = terms if match_all else list(dict.fromkeys(phrase_terms))
+
+    hits = rank(con, terms, required, where, params, None if phrases else limit)
+    if phrases:
+        hits = _with_phrases(con, hits, phrases, limit)
+    return con.execute("""
+        SELECT s.job_key, s.title, s.company, s.location, s.posted_date, s.role_family::VARCHAR AS role_family,
+               round(h.score, 3) AS score, s.job_link
+        FROM hits h
+        JOIN stg_job_postings s USING (job_key)
+        ORDER BY h.score DESC, s.job_key
+    """).df()[RESULT_COLUMNS]
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Maintain the BM25 search index over postings, or query it.")
+    p.add_argument("--db", default=str(DB_PATH))
+    p.add_argument("--table", default="stg_job_postings")
+    p.add_argument("--full-refresh", action="store_true", help="Re-tokenize every posting.")
+    p.add_argument("--batch-size", type=int, default=50_000, help="Postings tokenized (and committed) per pass.")
+    p.add_argument("--query", default=None, help='Search instead of indexing, e.g. "dbt snowflake" or \'"data mesh"\'.')
+    p.add_argument("--match-all", action="store_true", help="With --query, require every term.")
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--profile", default=None, help="Directory for a cProfile dump of the indexing run.")
+    args = p.parse_args()
+
+    if args.query:
+        con = duckdb.connect(args.db, read_only=True)
+        start = time.perf_counter()
+        hits = search(con, args.query, args.limit, match_all=args.match_all)
+        print(hits.drop(columns=["job_link"]).to_string(index=False))
+        print(f"{len(hits)} results in {(time.perf_counter() - start) * 1000:.0f} ms")
+        con.close()
+        return
+
+    con = duckdb.connect(args.db)
+    with track(con, "search_index", profile_dir=args.profile) as run:
+        run.rows_in = con.execute(f"SELECT COUNT(*) FROM {args.table}").fetchone()[0]
+        run.rows_out = build_index(con, args.table, args.full_refresh, args.batch_size)
+    con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+def bounded_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int,
+    initializer: Callable[..., None] | None = None,
+    initargs: tuple = (),
+    max_in_flight: int | None = None,
+) -> Iterator[R]:
+    """
+    map(fn, items) across a process pool, yielding results in input order.
+
+    Items are pulled lazily and at most `max_in_flight` (default 2 per worker)
+    are submitted at once, so a generator that reads shards from DuckDB never
+    gets more than a few shards ahead of the consumer. `initializer` runs once
+    per worker (e.g. to compile patterns or load a model). With workers <= 1
+    everything runs in-process.
+    """
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(fn, items)
+        return
+
+    limit = max_in_flight or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending: deque = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,301 @@
+import argparse
+import hashlib
+import json
+import pathlib
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List
+
+import duckdb
+
+from src.analytics.build_rollups import build_rollups
+from src.analytics.export_parquet import EXPORT_DIR, export_parquet
+from src.analytics.skill_cooccurrence import build_cooccurrence
+from src.clean.dedupe import build_canonical
+from src.clean.normalize import build_staging
+from src.ingest.load_raw import DEFAULT_REFERENCE_DATE, RAW_PATH, discover_snapshots, file_checksum, ingest_snapshots
+from src.ml.predict_role_family import model_fingerprint, write_predictions
+from src.nlp.extract_skills import SKILLS_PATH, extract_skills
+from src.nlp.search_index import build_index
+from src.telemetry import track
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+DB_PATH = REPO_ROOT / "warehouse" / "analytics.duckdb"
+MODEL_PATH = REPO_ROOT / "models" / "role_family_clf.joblib"
+
+@dataclass
+class Stage:
+    """
+    One pipeline step: what it reads, what it writes and how to run it.
+
+    A stage's fingerprint hashes its code, its external inputs (files,
+    settings that change the output) and the fingerprints of the stages it
+    depends on, so an edit anywhere upstream reaches everything downstream.
+    `run` returns the stage's output row count; `source` is the table whose
+    row count is recorded as its input.
+    """
+    name: str
+    run: Callable[[duckdb.DuckDBPyConnection, argparse.Namespace], int | None]
+    outputs: List[str]
+    code: List[str]
+    deps: List[str] = field(default_factory=list)
+    inputs: Callable[[argparse.Namespace], List[str]] = lambda args: []
+    source: str | None = None
+
+def _raw_inputs(args: argparse.Namespace) -> List[str]:
+    snaps = discover_snapshots(args.raw, args.manifest, args.reference_date)
+    return [f"{s.snapshot_id}:{s.reference_date}:{file_checksum(s.path)}" for s in snaps]
+
+def _run_ingest(con: duckdb.DuckDBPyConnection, args: argparse.Namespace) -> int:
+    return ingest_snapshots(con, discover_snapshots(args.raw, args.manifest, args.reference_date))
+
+def _run_predict(con: duckdb.DuckDBPyConnection, args: argparse.Namespace) -> int:
+    n_rows = write_predictions(con, str(args.model), workers=args.workers)
+    print(f"Wrote {n_rows} rows to pred_role_family")
+    return n_rows
+
+def _run_rollups(con: duckdb.DuckDBPyConnection, args: argparse.Namespace) -> int:
+    build_rollups(con)
+    return con.execute("SELECT COUNT(*) FROM agg_skill_mentions").fetchone()[0]
+
+STAGES = [
+    Stage(
+        "ingest", _run_ingest,
+        outputs=["raw_job_postings", "raw_snapshots"],
+        code=["src/ingest/load_raw.py"],
+        inputs=_raw_inputs,
+    ),
+    Stage(
+        "normalize", lambda con, args: build_staging(con, incremental=True),
+        outputs=["stg_job_postings", "stg_normalize_state"],
+        code=["src/clean/normalize.py", "src/clean/schema.py"],
+        deps=["ingest"],
+        source="raw_job_postings",
+    ),
+    Stage(
+        "dedupe", lambda con, args: build_canonical(con, workers=args.workers),
+        outputs=["job_canonical"],
+        code=["src/clean/dedupe.py", "src/parallel.py"],
+        deps=["normalize"],
+        source="stg_job_postings",
+    ),
+    Stage(
+        "extract_skills", lambda con, args: extract_skills(con, workers=args.workers),
+        outputs=["job_skills", "skill_dim", "category_dim", "job_skills_posting_state", "job_skills_skill_state"],
+        code=["src/nlp/extract_skills.py", "src/clean/schema.py", "src/parallel.py"],
+        deps=["normalize"],
+        inputs=lambda args: [file_checksum(SKILLS_PATH)],
+        source="stg_job_postings",
+    ),
+    Stage(
+        "predict", _run_predict,
+        outputs=["pred_role_family"],
+        code=[
+            "src/ml/predict_role_family.py", "src/ml/utils.py", "src/ml/compact.py", "src/ml/features.py",
+            "src/clean/schema.py", "src/parallel.py",
+        ],
+        deps=["normalize"],
+        # Without a model predict is left out, but export still hashes it as a dependency
+        inputs=lambda args: [model_fingerprint(str(args.model)) if pathlib.Path(args.model).exists() else "no model"],
+        source="stg_job_postings",
+    ),
+    Stage(
+        "rollups", _run_rollups,
+        outputs=["agg_job_counts", "agg_skill_mentions"],
+        code=["src/analytics/build_rollups.py"],
+        deps=["normalize", "extract_skills"],
+        source="job_skills",
+    ),
+    Stage(
+        "cooccurrence", lambda con, args: build_cooccurrence(con),
+        outputs=["skill_cooccurrence"],
+        code=["src/analytics/skill_cooccurrence.py"],
+        deps=["normalize", "extract_skills"],
+        source="job_skills",
+    ),
+    Stage(
+        "search_index", lambda con, args: build_index(con),
+        outputs=["search_terms", "search_docs", "search_postings"],
+        code=["src/nlp/search_index.py"],
+        deps=["normalize"],
+        source="stg_job_postings",
+    ),
+    Stage(
+        "export", lambda con, args: export_parquet(con, pathlib.Path(args.export_dir)),
+        outputs=["parquet_export_state"],
+        code=["src/analytics/export_parquet.py"],
+        deps=["normalize", "extract_skills", "predict"],
+        inputs=lambda args: [str(args.export_dir)],
+        source="stg_job_postings",
+    ),
+]
+
+def with_deps(names: List[str]) -> List[Stage]:
+    """The named stages plus everything upstream of them, in STAGES (topological) order."""
+    by_name = {s.name: s for s in STAGES}
+    needed, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name not in needed:
+            needed.add(name)
+            stack.extend(by_name[name].deps)
+    return [s for s in STAGES if s.name in needed]
+
+def fingerprints(stages: List[Stage], args: argparse.Namespace) -> Dict[str, str]:
+    """Fingerprint of each stage; `stages` must be in dependency order and include every dependency."""
+    out: Dict[str, str] = {}
+    for stage in stages:
+        h = hashlib.sha256(stage.name.encode("utf-8"))
+        for path in stage.code:
+            h.update(file_checksum(REPO_ROOT / path).encode("utf-8"))
+        for value in stage.inputs(args):
+            h.update(value.encode("utf-8"))
+        for dep in stage.deps:
+            h.update(out[dep].encode("utf-8"))
+        out[stage.name] = h.hexdigest()
+    return out
+
+def _ensure_state(con: duckdb.DuckDBPyConnection) -> None:
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_state (
+            stage VARCHAR PRIMARY KEY,
+            fingerprint VARCHAR,
+            output_rows VARCHAR,
+            seconds DOUBLE,
+            finished_at TIMESTAMP
+        )
+    """)
+
+def _output_rows(con: duckdb.DuckDBPyConnection, tables: List[str]) -> Dict[str, int | None]:
+    existing = {r[0] for r in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+    return {
+        t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] if t in existing else None
+        for t in tables
+    }
+
+def is_fresh(con: duckdb.DuckDBPyConnection, stage: Stage, fingerprint: str) -> bool:
+    """
+    True if the stage last ran with this fingerprint and its outputs are as it left them.
+
+    Row counts stand in for table versions: a stage run by hand outside the
+    pipeline, or an output dropped since, makes the stage stale again.
+    """
+    row = con.execute(
+        "SELECT fingerprint, output_rows FROM pipeline_state WHERE stage = ?", [stage.name]
+    ).fetchone()
+    if row is None or row[0] != fingerprint:
+        return False
+    rows = _output_rows(con, stage.outputs)
+    return None not in rows.values() and rows == json.loads(row[1])
+
+def _run_stage(con: duckdb.DuckDBPyConnection, stage: Stage, fingerprint: str, args: argparse.Namespace) -> float:
+    # Each stage gets its own cursor on the shared connection, so concurrent
+    # stages keep separate transactions and temp tables
+    cur = con.cursor()
+    try:
+        start = time.perf_counter()
+        rows_in = _output_rows(cur, [stage.source])[stage.source] if stage.source else None
+        with track(cur, stage.name, rows_in=rows_in, profile_dir=args.profile) as run:
+            run.rows_out = stage.run(cur, args)
+        seconds = time.perf_counter() - start
+        cur.execute(
+            "INSERT OR REPLACE INTO pipeline_state VALUES (?, ?, ?, ?, current_timestamp)",
+            [stage.name, fingerprint, json.dumps(_output_rows(cur, stage.outputs)), seconds],
+        )
+    finally:
+        cur.close()
+    return seconds
+
+def run_pipeline(
+    con: duckdb.DuckDBPyConnection,
+    stages: List[Stage],
+    args: argparse.Namespace,
+    force: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, str]:
+    """
+    Run the stale stages of `stages`, each as soon as its dependencies are done.
+
+    Independent stages (e.g. extract_skills and predict) run concurrently on
+    up to args.jobs threads. Dependencies outside `stages` are taken as they
+    are. Returns each stage's outcome: ran, skipped, failed or blocked.
+    """
+    _ensure_state(con)
+    fps = fingerprints(with_deps([s.name for s in stages]), args)
+    names = {s.name for s in stages}
+    todo = {s.name: s for s in stages if force or not is_fresh(con, s, fps[s.name])}
+    status = {s.name: "skipped" for s in stages if s.name not in todo}
+    for name in status:
+        print(f"[{name}] up to date (fingerprint {fps[name][:12]}), skipping")
+    if dry_run:
+        for name in todo:
+            print(f"[{name}] would run")
+        status.update({name: "would run" for name in todo})
+        return {s.name: status[s.name] for s in stages}
+
+    running: Dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        while todo or running:
+            for name, stage in list(todo.items()):
+                deps = [d for d in stage.deps if d in names]
+                if any(status.get(d) in ("failed", "blocked") for d in deps):
+                    status[name] = "blocked"
+                    del todo[name]
+                elif all(status.get(d) in ("ran", "skipped") for d in deps):
+                    print(f"[{name}] running")
+                    running[pool.submit(_run_stage, con, stage, fps[name], args)] = name
+                    del todo[name]
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                name = running.pop(fut)
+                try:
+                    print(f"[{name}] done in {fut.result():.2f}s")
+                    status[name] = "ran"
+                except Exception as e:
+                    print(f"[{name}] failed: {e!r}")
+                    status[name] = "failed"
+    return {s.name: status[s.name] for s in stages}
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Run the pipeline DAG, skipping stages whose inputs are unchanged.")
+    p.add_argument("--db", default=str(DB_PATH))
+    p.add_argument("--stages", nargs="+", choices=[s.name for s in STAGES], default=None,
+                   help="Only these stages (default: all; predict is left out when --model is missing).")
+    p.add_argument("--force", action="store_true", help="Run the selected stages even if they are up to date.")
+    p.add_argument("--dry-run", action="store_true", help="Only print which stages would run.")
+    p.add_argument("--jobs", type=int, default=2,
+                   help="Stages run concurrently when their dependencies allow (1 records per-stage CPU and RSS).")
+    p.add_argument("--workers", type=int, default=1, help="Processes used inside dedupe, extract_skills and predict.")
+    p.add_argument("--raw", default=str(RAW_PATH))
+    p.add_argument("--manifest", default=None)
+    p.add_argument("--reference-date", type=date.fromisoformat, default=DEFAULT_REFERENCE_DATE)
+    p.add_argument("--model", default=str(MODEL_PATH))
+    p.add_argument("--export-dir", default=str(EXPORT_DIR), help="Root of the Hive-partitioned Parquet export.")
+    p.add_argument("--profile", default=None,
+                   help="Directory for per-stage cProfile dumps (stages running concurrently are not profiled).")
+    args = p.parse_args()
+
+    selected = args.stages or [s.name for s in STAGES]
+    if not pathlib.Path(args.model).exists():
+        if "predict" in selected and args.stages:
+            raise SystemExit(f"Model not found: {args.model}")
+        print(f"No model at {args.model}; leaving out predict (train one with src.ml.train_role_family)")
+        selected = [n for n in selected if n != "predict"]
+    stages = [s for s in STAGES if s.name in selected]
+
+    con = duckdb.connect(args.db)
+    start = time.perf_counter()
+    status = run_pipeline(con, stages, args, args.force, args.dry_run)
+    con.close()
+
+    print(f"Pipeline finished in {time.perf_counter() - start:.2f}s: "
+          + ", ".join(f"{name} {outcome}" for name, outcome in status.items()))
+    if any(outcome in ("failed", "blocked") for outcome in status.values()):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
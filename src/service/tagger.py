@@ -0,0 +1,198 @@
+import argparse
+import json
+import pathlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+from src.ml.predict_role_family import load_model
+from src.nlp.extract_skills import SkillMatcher, load_skills
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[2]
+MODEL_PATH = REPO_ROOT / "models" / "role_family_clf.joblib"
+
+class Tagger:
+    """Skill matcher + role-family model, loaded once and reused for every batch."""
+
+    def __init__(self, model_path: str):
+        self.matcher = SkillMatcher(load_skills())
+        self.model = load_model(model_path)
+
+    def tag(self, postings: List[Dict]) -> List[Dict]:
+        titles = [str(p.get("title") or "") for p in postings]
+        descriptions = [str(p.get("description") or "") for p in postings]
+        # Same texts as the batch jobs: extract_skills lowercases "title description",
+        # the model sees make_text's stripped "title description"
+        texts = [f"{t} {d}" for t, d in zip(titles, descriptions)]
+        if hasattr(self.model, "predict_proba"):
+            proba = self.model.predict_proba([t.strip() for t in texts])
+            labels = self.model.classes_[proba.argmax(axis=1)]
+            confidences = proba.max(axis=1).tolist()
+        else:
+            labels = self.model.predict([t.strip() for t in texts])
+            confidences = [None] * len(texts)
+
+        out = []
+        for text, label, conf in zip(texts, labels, confidences):
+            skills = sorted(self.matcher.match(text.lower()))
+            out.append({
+                "skills": [{"skill": s, "category": c} for s, c in skills],
+                "role_family": str(label),
+                "confidence": conf,
+            })
+        return out
+
+class MicroBatcher:
+    """
+    Collects postings from concurrent requests into one model call.
+
+    A single worker thread takes the first waiting posting plus everything
+    already queued, then keeps taking more until it has max_batch postings or
+    max_wait_ms has passed (0 never waits: batches form only under load), and
+    scores them together; vectorizing and scoring a batch costs far less than
+    the same postings one by one.
+    """
+
+    def __init__(self, tagger: Tagger, max_batch: int, max_wait_ms: float):
+        self.tagger = tagger
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "queue.Queue[tuple[Dict, Future]]" = queue.Queue()
+        self.batches = 0
+        self.postings = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, postings: List[Dict]) -> List[Future]:
+        futures = []
+        for posting in postings:
+            fut: Future = Future()
+            self.queue.put((posting, fut))
+            futures.append(fut)
+        return futures
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Whatever is already queued joins immediately; only then wait
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self.tagger.tag([posting for posting, _ in batch])
+            except Exception as e:  # fail this batch's requests, keep serving
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self.batches += 1
+            self.postings += len(batch)
+            for (_, fut), result in zip(batch, results):
+                fut.set_result(result)
+
+class TaggingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connects from bursts of concurrent clients
+    request_queue_size = 128
+
+def make_handler(batcher: MicroBatcher, timeout: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path != "/health":
+                self._send(404, {"error": "not found"})
+                return
+            self._send(200, {
+                "status": "ok",
+                "batches": batcher.batches,
+                "postings": batcher.postings,
+                "avg_batch": round(batcher.postings / max(batcher.batches, 1), 2),
+            })
+
+        def do_POST(self) -> None:
+            if self.path != "/tag":
+                self._send(404, {"error": "not found"})
+                return
+            if "Content-Length" not in self.headers:
+                self._send(411, {"error": "Content-Length required"})
+                return
+            try:
+                length = int(self.headers["Content-Length"])
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send(400, {"error": "Content-Length must be a non-negative integer"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                payload = None
+            if not isinstance(payload, dict):
+                self._send(400, {"error": "body must be a JSON object"})
+                return
+            # {"title": ..., "description": ...} or {"postings": [{...}, ...]}
+            single = "postings" not in payload
+            postings = [payload] if single else payload["postings"]
+            if not isinstance(postings, list) or not all(isinstance(p, dict) for p in postings):
+                self._send(400, {"error": "postings must be a list of objects"})
+                return
+            try:
+                results = [f.result(timeout=timeout) for f in batcher.submit(postings)]
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+            self._send(200, results[0] if single else {"results": results})
+
+        def log_message(self, format, *args) -> None:  # keep the console quiet under load
+            pass
+
+    return Handler
+
+def main() -> None:
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--model", default=str(MODEL_PATH), help="joblib Pipeline or a src.ml.compact directory.")
+    p.add_argument("--max-batch", type=int, default=64, help="Most postings scored in one model call.")
+    p.add_argument("--max-wait-ms", type=float, default=2.0, help="How long a batch waits to fill up.")
+    p.add_argument("--timeout", type=float, default=30.0, help="Seconds a request waits for its result.")
+    args = p.parse_args()
+
+    start = time.perf_counter()
+    tagger = Tagger(args.model)
+    # Warm-up call so the first real request doesn't pay for lazy initialization
+    tagger.tag([{"title": "data engineer", "description": "python sql"}])
+    batcher = MicroBatcher(tagger, args.max_batch, args.max_wait_ms)
+    server = TaggingServer((args.host, args.port), make_handler(batcher, args.timeout))
+    print(f"Loaded skills.yml and {args.model} in {time.perf_counter() - start:.2f}s")
+    print(f"Serving POST /tag and GET /health on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+import cProfile
+import functools
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List
+
+import duckdb
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+# Records from read-only connections (the dashboard) wait here until a writer flushes them
+SPOOL_PATH = REPO_ROOT / "warehouse" / "pipeline_runs_spool.jsonl"
+# Set to a directory to dump a cProfile file per stage from any entry point
+PROFILE_ENV = "JSR_PROFILE_DIR"
+
+# One id per process, so every stage of a src.pipeline run shares it
+RUN_ID = uuid.uuid4().hex[:12]
+
+COLUMNS = [
+    ("run_id", "VARCHAR"),
+    ("stage", "VARCHAR"),
+    ("started_at", "TIMESTAMP"),
+    ("wall_seconds", "DOUBLE"),
+    ("cpu_seconds", "DOUBLE"),
+    ("rows_in", "BIGINT"),
+    ("rows_out", "BIGINT"),
+    ("rows_per_sec", "DOUBLE"),
+    ("peak_rss_mb", "DOUBLE"),
+    ("status", "VARCHAR"),
+    ("error", "VARCHAR"),
+    ("profile_path", "VARCHAR"),
+    ("code_version", "VARCHAR"),
+    ("concurrent", "BOOLEAN"),
+]
+
+# ids of the StageRuns of tracked blocks running now, and of those that
+# overlapped another one at some point (their CPU / RSS readings are shared)
+_ACTIVE: set = set()
+_OVERLAPPED: set = set()
+_ACTIVE_LOCK = threading.Lock()
+# Stages on several threads may all try to flush the spool when they finish
+_FLUSH_LOCK = threading.Lock()
+# How often track() samples the RSS of the process and its pool workers
+RSS_SAMPLE_SECONDS = 0.05
+
+@dataclass
+class StageRun:
+    """Counters a stage fills in while it runs; the rest is measured by track()."""
+    stage: str
+    rows_in: int | None = None
+    rows_out: int | None = None
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # Pool workers (extract_skills, predict) count once they have been reaped
+    rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is KiB on Linux but bytes on macOS
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def _proc_kb(pid: int | str, field: str) -> int | None:
+    # A field of /proc/<pid>/status such as VmRSS, in KiB; None off Linux or once the process is gone
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _children(pid: int) -> List[int]:
+    pids: List[int] = []
+    for path in pathlib.Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            pids.extend(int(c) for c in path.read_text().split())
+        except (OSError, ValueError):
+            pass
+    return pids
+
+def _tree_rss_kb() -> int | None:
+    """Current RSS of this process plus every live descendant (e.g. pool workers), in KiB."""
+    total = _proc_kb(os.getpid(), "VmRSS")
+    if total is None:
+        return None
+    stack = _children(os.getpid())
+    while stack:
+        pid = stack.pop()
+        total += _proc_kb(pid, "VmRSS") or 0
+        stack.extend(_children(pid))
+    return total
+
+class _PeakRss:
+    """
+    Highest RSS of the process and its child processes while a block runs.
+
+    A background thread samples every RSS_SAMPLE_SECONDS; the process's own
+    high-water mark is also reset at the start (Linux clear_refs) and read at
+    the end, so spikes in this process between samples still count. Only
+    Linux exposes either, so elsewhere the peak is None.
+    """
+
+    def __init__(self) -> None:
+        self.peak_kb = _tree_rss_kb()
+        self._own_hwm = False
+        self._stop = threading.Event()
+        self._thread = None
+        if self.peak_kb is None:
+            return
+        try:
+            with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+                f.write("5")
+            self._own_hwm = True
+        except OSError:
+            pass
+        self._thread = threading.Thread(target=self._sample, name="telemetry-rss", daemon=True)
+        self._thread.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak_kb = max(self.peak_kb, _tree_rss_kb() or 0)
+
+    def stop(self) -> float | None:
+        """Stop sampling; returns the peak in MB."""
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, _tree_rss_kb() or 0)
+        if self._own_hwm:
+            self.peak_kb = max(self.peak_kb, _proc_kb("self", "VmHWM") or 0)
+        return self.peak_kb / 1024
+
+def _cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+@functools.lru_cache(maxsize=1)
+def code_version() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+def _ensure_table(con: duckdb.DuckDBPyConnection) -> None:
+    cols = ", ".join(f"{name} {dtype}" for name, dtype in COLUMNS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS pipeline_runs ({cols})")
+    # Tables created before a column was added get it appended
+    for name, dtype in COLUMNS:
+        con.execute(f"ALTER TABLE pipeline_runs ADD COLUMN IF NOT EXISTS {name} {dtype}")
+
+def _insert(con: duckdb.DuckDBPyConnection, rows: list) -> None:
+    names = ", ".join(name for name, _ in COLUMNS)
+    placeholders = ", ".join("?" for _ in COLUMNS)
+    for row in rows:
+        # .get: records spooled by an older version lack the newer columns
+        con.execute(
+            f"INSERT INTO pipeline_runs ({names}) VALUES ({placeholders})", [row.get(name) for name, _ in COLUMNS]
+        )
+
+def flush_spool(con: duckdb.DuckDBPyConnection) -> int:
+    """Move spooled records into pipeline_runs; returns how many were moved."""
+    with _FLUSH_LOCK:
+        # Files a failed flush left behind are retried first
+        pending = sorted(SPOOL_PATH.parent.glob(f"{SPOOL_PATH.stem}.*.flush"))
+        if SPOOL_PATH.exists():
+            # Renamed first so records spooled meanwhile land in a fresh file
+            claimed = SPOOL_PATH.with_suffix(f".{RUN_ID}-{uuid.uuid4().hex[:8]}.flush")
+            try:
+                SPOOL_PATH.rename(claimed)
+                pending.append(claimed)
+            except FileNotFoundError:  # flushed by another process
+                pass
+        moved = 0
+        for path in pending:
+            rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+            # One transaction per file, so a failure leaves it to be retried whole
+            _ensure_table(con)
+            con.execute("BEGIN TRANSACTION")
+            try:
+                _insert(con, rows)
+                con.execute("COMMIT")
+            except duckdb.Error:
+                con.execute("ROLLBACK")
+                raise
+            path.unlink()
+            moved += len(rows)
+        return moved
+
+def record(con: duckdb.DuckDBPyConnection | None, row: dict) -> None:
+    """Append one record to pipeline_runs, or to the spool file when `con` can't write."""
+    if con is not None:
+        try:
+            _ensure_table(con)
+            _insert(con, [row])
+        except duckdb.Error:
+            pass  # read-only connection, or a transaction the failed stage left aborted
+        else:
+            try:
+                flush_spool(con)
+            except duckdb.Error:
+                pass  # the spooled records stay on disk for the next writer
+            return
+    SPOOL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(SPOOL_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(row, default=str) + "\n")
+
+@contextmanager
+def track(
+    con: duckdb.DuckDBPyConnection | None,
+    stage: str,
+    rows_in: int | None = None,
+    profile_dir: str | None = None,
+) -> Iterator[StageRun]:
+    """
+    Time the enclosed block and record it in pipeline_runs.
+
+    Wall and CPU time (including reaped child processes), rows in/out as set
+    on the yielded StageRun, rows/sec and the peak RSS of the process and its
+    pool workers during the block (see _PeakRss; NULL off Linux) are recorded
+    whether the block succeeds or raises. CPU time and RSS can only be
+    measured per process, so when another tracked block runs at the same time
+    (src.pipeline with --jobs > 1, concurrent dashboard sessions) both are
+    recorded as NULL and the record is flagged `concurrent`. With
+    profile_dir (or the JSR_PROFILE_DIR environment variable) the block also
+    runs under cProfile and the stats are written to <dir>/<run_id>_<stage>.prof.
+    """
+    run = StageRun(stage, rows_in)
+    with _ACTIVE_LOCK:
+        if _ACTIVE:
+            _OVERLAPPED.update(_ACTIVE)
+            _OVERLAPPED.add(id(run))
+        _ACTIVE.add(id(run))
+    profile_dir = profile_dir or os.environ.get(PROFILE_ENV)
+    profiler = cProfile.Profile() if profile_dir else None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:  # another stage in this process is already being profiled
+            profiler = None
+
+    started_at = datetime.now()
+    rss = _PeakRss()
+    wall, cpu = time.perf_counter(), _cpu_seconds()
+    status, error = "ok", None
+    try:
+        yield run
+    except BaseException as e:
+        status, error = "failed", repr(e)
+        raise
+    finally:
+        wall, cpu = time.perf_counter() - wall, _cpu_seconds() - cpu
+        peak_mb = rss.stop()
+        with _ACTIVE_LOCK:
+            _ACTIVE.discard(id(run))
+            concurrent = id(run) in _OVERLAPPED
+            _OVERLAPPED.discard(id(run))
+        profile_path = None
+        if profiler is not None:
+            profiler.disable()
+            path = pathlib.Path(profile_dir) / f"{RUN_ID}_{stage}.prof"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(path))
+            profile_path = str(path)
+        rows = run.rows_in if run.rows_in is not None else run.rows_out
+        record(con, {
+            "run_id": RUN_ID,
+            "stage": stage,
+            "started_at": started_at,
+            "wall_seconds": wall,
+            "cpu_seconds": None if concurrent else cpu,
+            "rows_in": run.rows_in,
+            "rows_out": run.rows_out,
+            "rows_per_sec": rows / wall if rows is not None and wall > 0 else None,
+            "peak_rss_mb": None if concurrent else peak_mb,
+            "status": status,
+            "error": error,
+            "profile_path": profile_path,
+            "code_version": code_version(),
+            "concurrent": concurrent,
+        })
+
+def timed(stage: str) -> Callable:
+    """Decorator form of track() for read-only callers; rows_out is len() of a list / DataFrame result."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(None, stage) as run:
+                result = fn(*args, **kwargs)
+                # tuples are several values rather than rows
+                run.rows_out = len(result) if hasattr(result, "__len__") and not isinstance(result, tuple) else None
+                return result
+        return wrapper
+    return decorate
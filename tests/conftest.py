@@ -0,0 +1,76 @@
+import pathlib
+import sys
+
+import duckdb
+import pandas as pd
+import pytest
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.clean.normalize import build_staging  # noqa: E402
+from src.ingest.load_raw import discover_snapshots, ingest_snapshots  # noqa: E402
+from src.ingest.synthetic import COLUMNS, generate  # noqa: E402
+
+# Hand-written rows covering what the scraper leaves behind: stray and
+# Unicode whitespace, empty fields, every Date shape parse_indeed_date knows,
+# and the same posting twice in one file.
+EDGE_ROWS = [
+    ["Senior Data Engineer  \n", "Acme", "Remote", 4.0, "PostedToday", "$120,000 a year", "Build pipelines",
+     "https://indeed.com/a", "We use Python, SQL and Apache Spark.\r\nSpark Streaming is a plus."],
+    ["Data Analyst", "Beta Corp", "Austin, TX", None, "3 days ago", None, "",
+     "https://indeed.com/b", "Excel, Tableau and Power BI dashboards."],
+    ["Machine Learning Engineer", "Gamma", "Seattle, WA", 3.5, "30+ days ago", "", "ML",
+     "https://indeed.com/c", "PyTorch, TensorFlow, scikit-learn, c++ and C# services."],
+    ["BI Developer", "Delta", "", None, "Just posted", None, None,
+     "https://indeed.com/d", "SQL Server, SSIS and Looker."],
+    ["Business Intelligence Analyst", "Epsilon", "Chicago, IL", 4.0, "2022-11-01", None, "BI",
+     "https://indeed.com/e", "dbt   and\tSnowflake　on AWS."],
+    ["", None, None, None, "", None, None, None, None],
+    ["Data Scientist", "Zeta", "Boston, MA", None, "EmployerActive 5 days ago", None, None,
+     "https://indeed.com/f", "R, Python, pandas, numpy; Spark."],
+    ["Senior Data Engineer  \n", "Acme", "Remote", 4.0, "PostedToday", "$120,000 a year", "Build pipelines",
+     "https://indeed.com/a", "A later copy of the same posting."],
+]
+
+def write_snapshot(path: pathlib.Path, rows: list) -> pathlib.Path:
+    df = pd.DataFrame(rows, columns=COLUMNS[1:])
+    df.insert(0, "", range(len(df)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False)
+    return path
+
+def ingest(con: duckdb.DuckDBPyConnection, raw: pathlib.Path) -> int:
+    return ingest_snapshots(con, discover_snapshots(str(raw)), workers=2)
+
+@pytest.fixture(scope="session")
+def synthetic_csv(tmp_path_factory) -> pathlib.Path:
+    """A small seeded synthetic corpus plus EDGE_ROWS, as one snapshot file."""
+    out = tmp_path_factory.mktemp("raw") / "jobs_2022-11-20.csv"
+    generate(out, 2_000, seed=7, chunk_size=500)
+    df = pd.read_csv(out)
+    edges = pd.DataFrame(EDGE_ROWS, columns=COLUMNS[1:])
+    edges.insert(0, "Unnamed: 0", range(len(df), len(df) + len(edges)))
+    pd.concat([df, edges], ignore_index=True).rename(columns={"Unnamed: 0": ""}).to_csv(out, index=False)
+    return out
+
+@pytest.fixture(autouse=True)
+def spool(tmp_path, monkeypatch):
+    # Telemetry flushes spooled records into whichever connection writes next;
+    # keep the repo's warehouse spool out of the throwaway test databases
+    path = tmp_path / "pipeline_runs_spool.jsonl"
+    monkeypatch.setattr("src.telemetry.SPOOL_PATH", path)
+    return path
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    yield con
+    con.close()
+
+@pytest.fixture
+def staged(con, synthetic_csv) -> duckdb.DuckDBPyConnection:
+    """A connection with synthetic_csv ingested and staged."""
+    ingest(con, synthetic_csv)
+    build_staging(con)
+    return con
@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.clean.dedupe import build_canonical, cluster, minhash, _perm_seeds
+
+def test_pairs_missed_by_the_star_are_linked():
+    # A, B and C share band 0, so they land in one bucket with A as its head.
+    # B and C agree on 13 of 16 rows (0.81) but each agrees with A on only 8,
+    # and B and C fall in different band-1 buckets: the star alone misses them.
+    a = np.zeros(16, dtype=np.uint32)
+    b = np.r_[np.zeros(8), np.arange(1, 9)].astype(np.uint32)
+    c = b.copy()
+    c[13:] += 100
+    roots = cluster(np.vstack([a, b, c]), bands=2, threshold=0.8)
+    assert roots[0] == 0
+    assert roots[1] == roots[2] == 1
+
+def test_reposts_cluster_and_distinct_postings_do_not():
+    base = " ".join(f"word{i}" for i in range(200))
+    texts = [
+        base,
+        base + " apply today",
+        "completely different posting about warehouse logistics and forklifts " * 5,
+        base.replace("word7 ", "WORD7 "),  # case-insensitive: the same text
+        "",
+    ]
+    roots = cluster(minhash(texts, _perm_seeds(128, 42)))
+    assert roots[0] == roots[1] == roots[3] == 0
+    assert roots[2] == 2 and roots[4] == 4
+
+def test_postings_staged_after_dedupe_stay_in_the_canonical_view(staged):
+    build_canonical(staged)
+    n_canonical = staged.execute("SELECT COUNT(*) FROM stg_job_postings_canonical").fetchone()[0]
+    staged.execute("""
+        INSERT INTO stg_job_postings
+        SELECT * REPLACE (job_key + 1 AS job_key) FROM stg_job_postings ORDER BY job_key DESC LIMIT 1
+    """)
+    assert staged.execute("SELECT COUNT(*) FROM stg_job_postings_canonical").fetchone()[0] == n_canonical + 1
@@ -0,0 +1,32 @@
+from src.nlp.extract_skills import SkillMatcher, extract_skills, iter_shards, load_skills
+
+def job_skills(con) -> list:
+    return con.execute("SELECT job_key, skill, category FROM job_skills_named ORDER BY ALL").fetchall()
+
+def test_shards_are_contiguous_job_id_ranges(staged):
+    job_ids = sorted(r[0] for r in staged.execute("SELECT job_id FROM stg_job_postings").fetchall())
+    for shard_size, min_shards in [(1_000_000, 1), (97, 1), (1_000_000, 3)]:
+        shards = [[job_id for job_id, _, _ in shard] for shard in iter_shards(staged, shard_size, min_shards=min_shards)]
+        assert [j for shard in shards for j in shard] == job_ids
+        assert len(shards) >= min_shards and max(map(len, shards)) <= shard_size
+
+def test_sharded_and_parallel_match_single_process(staged):
+    extract_skills(staged, workers=1, shard_size=1_000_000, full_refresh=True)
+    expected = job_skills(staged)
+    assert expected
+
+    # Many small shards, in-process and across a pool
+    for workers in [1, 2]:
+        extract_skills(staged, workers=workers, shard_size=97, full_refresh=True)
+        assert job_skills(staged) == expected
+
+    # ... and the same as matching every posting directly
+    matcher = SkillMatcher(load_skills())
+    direct = sorted(
+        (job_key, skill, category)
+        for job_key, title, description in staged.execute(
+            "SELECT job_key, title, description_full FROM stg_job_postings"
+        ).fetchall()
+        for skill, category in matcher.match(f"{title} {description}".lower())
+    )
+    assert direct == expected
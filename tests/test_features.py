@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+import src.ml.features as features  # noqa: E402
+from src.ml.features import ensure_feature_store, load_feature_store  # noqa: E402
+
+def postings(texts: list) -> pd.DataFrame:
+    return pd.DataFrame({
+        "posting_id": [f"{i:016x}" for i in range(len(texts))],
+        "title": ["Data Engineer"] * len(texts),
+        "location": [""] * len(texts),
+        "description": texts,
+    })
+
+def test_rebuild_replaces_the_whole_store(tmp_path):
+    path = tmp_path / "store"
+    first = postings(["python and sql", "spark pipelines", "dbt models"])
+    second = postings(["airflow dags", "kafka streams"])
+    ensure_feature_store(first, str(path))
+    store = ensure_feature_store(second, str(path))
+
+    assert store.counts.shape[0] == 2
+    assert "kafka" in store.terms and "python" not in store.terms
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["store"]
+
+def test_interrupted_rebuild_keeps_the_old_store(tmp_path, monkeypatch):
+    path = tmp_path / "store"
+    first = postings(["python and sql", "spark pipelines", "dbt models"])
+    old = ensure_feature_store(first, str(path))
+    old_manifest = old.manifest
+    del old
+
+    # Fail after two arrays have been written
+    real_save, calls = np.save, []
+    def failing_save(file, arr):
+        calls.append(file)
+        if len(calls) == 3:
+            raise OSError("disk full")
+        real_save(file, arr)
+    monkeypatch.setattr(features.np, "save", failing_save)
+    with pytest.raises(OSError):
+        ensure_feature_store(postings(["airflow dags", "kafka streams"]), str(path))
+    monkeypatch.undo()
+
+    store = load_feature_store(str(path))
+    assert store.manifest == old_manifest
+    assert store.counts.shape[0] == 3 and "python" in store.terms
@@ -0,0 +1,99 @@
+import argparse
+
+import duckdb
+import pandas as pd
+
+from conftest import ingest
+
+import src.nlp.extract_skills as extract_module
+from src.clean.normalize import STG_COLUMNS, build_staging
+from src.ingest.load_raw import DEFAULT_REFERENCE_DATE
+from src.nlp.extract_skills import extract_skills, load_skills
+from src.pipeline import STAGES, run_pipeline
+
+def staging(con) -> list:
+    return con.execute(f"SELECT {', '.join(STG_COLUMNS)} FROM stg_job_postings ORDER BY job_key").fetchall()
+
+def job_skills(con) -> list:
+    return con.execute("SELECT job_key, skill, category FROM job_skills_named ORDER BY ALL").fetchall()
+
+def full_rebuild(raw_dir) -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect()
+    ingest(con, raw_dir)
+    build_staging(con)
+    extract_skills(con, full_refresh=True)
+    return con
+
+def split_snapshots(synthetic_csv):
+    """Two overlapping snapshots; the later one edits some descriptions of postings both contain."""
+    df = pd.read_csv(synthetic_csv, keep_default_na=False).rename(columns={"Unnamed: 0": ""})
+    first, second = df.iloc[:1_200].copy(), df.iloc[800:].copy()
+    edited = second.index[:100:3]
+    second.loc[edited, "Descriptions"] = second.loc[edited, "Descriptions"] + " Now also Rust and Kafka."
+    second.loc[second.index[1:100:3], "Descriptions"] = "Rewritten without any tools."
+    return first, second
+
+def test_incremental_matches_full_rebuild(synthetic_csv, tmp_path, monkeypatch, capsys):
+    first, second = split_snapshots(synthetic_csv)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    con = duckdb.connect()
+
+    first.to_csv(raw / "jobs_2022-11-10.csv", index=False)
+    ingest(con, raw)
+    build_staging(con, incremental=True)
+    extract_skills(con)
+
+    second.to_csv(raw / "jobs_2022-11-20.csv", index=False)
+    ingest(con, raw)
+    capsys.readouterr()
+    build_staging(con, incremental=True)
+    extract_skills(con)
+    # The second round must have gone down the incremental paths
+    out = capsys.readouterr().out
+    assert "Incremental: upserted" in out and "new/changed postings" in out
+
+    full = full_rebuild(raw)
+    assert staging(con) == staging(full)
+    assert job_skills(con) == job_skills(full)
+
+    # Edit the taxonomy: drop a skill, add one, change another's category
+    skills = load_skills()
+    dropped = skills["languages"].pop(0)
+    skills.setdefault("languages", []).append("kafka")
+    moved = skills["cloud"].pop(0)
+    skills["databases"].append(moved)
+    monkeypatch.setattr(extract_module, "load_skills", lambda: skills)
+    extract_skills(con)
+    extract_skills(full, full_refresh=True)
+    assert job_skills(con) == job_skills(full)
+    assert not any(skill == dropped.lower() for _, skill, _ in job_skills(con))
+    con.close()
+    full.close()
+
+def pipeline_args(raw, tmp_path) -> argparse.Namespace:
+    return argparse.Namespace(
+        raw=str(raw), manifest=None, reference_date=DEFAULT_REFERENCE_DATE, jobs=2, workers=1,
+        profile=None, model=str(tmp_path / "no_model.joblib"), export_dir=str(tmp_path / "parquet"),
+    )
+
+def test_pipeline_reruns_only_stale_stages(synthetic_csv, tmp_path):
+    first, second = split_snapshots(synthetic_csv)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    stages = [s for s in STAGES if s.name in ("ingest", "normalize", "extract_skills", "rollups")]
+    con = duckdb.connect(str(tmp_path / "pipeline.duckdb"))
+    args = pipeline_args(raw, tmp_path)
+
+    first.to_csv(raw / "jobs_2022-11-10.csv", index=False)
+    assert set(run_pipeline(con, stages, args).values()) == {"ran"}
+    assert set(run_pipeline(con, stages, args).values()) == {"skipped"}
+
+    second.to_csv(raw / "jobs_2022-11-20.csv", index=False)
+    assert set(run_pipeline(con, stages, args).values()) == {"ran"}
+
+    full = full_rebuild(raw)
+    assert staging(con) == staging(full)
+    assert job_skills(con) == job_skills(full)
+    con.close()
+    full.close()
@@ -0,0 +1,30 @@
+from conftest import EDGE_ROWS, ingest, write_snapshot
+
+from src.clean.normalize import STG_COLUMNS, check_parity, normalize_pandas, normalize_sql
+from src.clean.schema import create_types
+
+def test_sql_matches_pandas(con, synthetic_csv):
+    ingest(con, synthetic_csv)
+    create_types(con)
+    assert check_parity(con) == 0
+
+    expected = normalize_pandas(con)
+    got = con.execute(f"SELECT {', '.join(STG_COLUMNS)} FROM ({normalize_sql()})").df()
+    # Same rows, same winners among duplicates, same order
+    assert got["job_id"].tolist() == expected["job_id"].tolist()
+    assert got["snapshot_id"].tolist() == expected["snapshot_id"].tolist()
+
+def test_sql_matches_pandas_across_snapshots(con, tmp_path):
+    # The same posting in two snapshots: the later snapshot's row wins, and
+    # relative dates are parsed against each file's own reference date
+    write_snapshot(tmp_path / "jobs_2022-11-10.csv", EDGE_ROWS)
+    write_snapshot(tmp_path / "jobs_2022-11-20.csv", EDGE_ROWS[:3])
+    ingest(con, tmp_path)
+    create_types(con)
+    assert check_parity(con) == 0
+
+    got = con.execute(f"""
+        SELECT title, snapshot_id, posted_date::VARCHAR AS posted_date
+        FROM ({normalize_sql()}) WHERE title = 'Data Analyst'
+    """).fetchall()
+    assert got == [("Data Analyst", "jobs_2022-11-20", "2022-11-17")]
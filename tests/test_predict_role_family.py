@@ -0,0 +1,36 @@
+import pytest
+
+from conftest import REPO_ROOT
+
+pytest.importorskip("sklearn")
+
+import src.ml.predict_role_family as predict  # noqa: E402
+from src.ml.predict_role_family import _ensure_cache, write_predictions  # noqa: E402
+
+MODEL_PATH = REPO_ROOT / "models" / "role_family_clf.joblib"
+
+def predictions(con, table: str = "pred_role_family") -> list:
+    return con.execute(f"SELECT job_key, pred_role_family::VARCHAR, pred_confidence FROM {table} ORDER BY job_key").fetchall()
+
+def test_workers_match_single_process(staged):
+    n = write_predictions(staged, str(MODEL_PATH), batch_size=300, workers=1, cache_table=None)
+    expected = predictions(staged)
+    assert n == len(expected) == staged.execute("SELECT COUNT(*) FROM stg_job_postings").fetchone()[0]
+
+    write_predictions(staged, str(MODEL_PATH), batch_size=300, workers=2, cache_table=None)
+    assert predictions(staged) == expected
+
+def cached_models(con) -> list:
+    return [r[0] for r in con.execute("SELECT DISTINCT model_fingerprint FROM cache ORDER BY 1").fetchall()]
+
+def test_cache_keeps_recently_used_models(con, monkeypatch):
+    monkeypatch.setattr(predict, "CACHE_MODELS", 2)
+    for fingerprint in ["a", "b", "a"]:
+        _ensure_cache(con, "cache", fingerprint)
+        con.execute("INSERT OR IGNORE INTO cache VALUES ('h', ?, 'bi', 0.9)", [fingerprint])
+    # Switching back and forth between two models keeps both
+    assert cached_models(con) == ["a", "b"]
+
+    _ensure_cache(con, "cache", "c")
+    # "b" is the least recently used of three models
+    assert cached_models(con) == ["a"]
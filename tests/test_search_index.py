@@ -0,0 +1,13 @@
+from src.nlp.search_index import build_index, search
+
+def test_phrase_matches_across_line_breaks_and_repeated_spaces(staged):
+    [(job_key,)] = staged.execute("SELECT job_key FROM stg_job_postings WHERE job_link = 'https://indeed.com/c'").fetchall()
+    staged.execute(
+        "UPDATE stg_job_postings SET description_full = ? WHERE job_key = ?",
+        ["Deploys PyTorch models\nto   Kubernetes  clusters.", job_key],
+    )
+    build_index(staged)
+
+    assert job_key in set(search(staged, '"pytorch models to kubernetes"')["job_key"])
+    assert job_key in set(search(staged, '"Models   To kubernetes"')["job_key"])
+    assert job_key not in set(search(staged, '"kubernetes models"')["job_key"])
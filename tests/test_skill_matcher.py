@@ -0,0 +1,31 @@
+from src.nlp.extract_skills import SkillMatcher, compile_patterns, load_skills
+
+def match_one_by_one(compiled, text: str) -> set:
+    return {(skill, category) for category, pats in compiled.items() for skill, pat in pats if pat.search(text)}
+
+def test_trie_matches_per_skill_patterns(staged):
+    skills = load_skills()
+    matcher, compiled = SkillMatcher(skills), compile_patterns(skills)
+    texts = [
+        f"{title} {description}".lower()
+        for title, description in staged.execute("SELECT title, description_full FROM stg_job_postings").fetchall()
+    ]
+    # Prefix overlaps, symbols and boundaries the trie has to resolve like the per-skill regexes do
+    texts += [
+        "spark streaming and spark", "pyspark, sparkling", "c++/c# and c", "power bi; powerbi", "sql-server",
+        "aws-glue aws", "r, r&d, rust", "",
+    ]
+    found_any = False
+    for text in texts:
+        expected = match_one_by_one(compiled, text)
+        assert matcher.match(text) == expected, text
+        found_any = found_any or bool(expected)
+    assert found_any
+
+def test_overlapping_skills():
+    skills = {"big_data": ["Spark", "Spark Streaming", "Spark"], "languages": ["C", "C++", "C#"], "bi": ["Power BI"]}
+    matcher, compiled = SkillMatcher(skills), compile_patterns(skills)
+    assert matcher.match("spark streaming jobs") == {("spark", "big_data"), ("spark streaming", "big_data")}
+    # "c" still matches inside "c++" because '+' is not a word character, as with the per-skill regexes
+    for text in ["c++ only", "c#, c", "sparkly power bi", "power-bi", "spark-streaming"]:
+        assert matcher.match(text) == match_one_by_one(compiled, text), text